@@ -0,0 +1,5 @@
+"""Shared helpers for the API handlers.
+
+Vercel does not turn underscore-prefixed paths into serverless functions,
+so everything in here is importable by the handlers without being routed.
+"""
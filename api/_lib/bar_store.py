@@ -0,0 +1,329 @@
+"""Persistent on-disk OHLCV store behind /api/stock/historical.
+
+Bars for each (symbol, interval) live in one memory-mapped NumPy
+structured array, sorted by timestamp, next to a small JSON metadata
+file. Past bars never change, so after the first download only the
+missing tail is fetched from Yahoo and every requested window is served
+by slicing the local array. Coarser intraday intervals are resampled
+from the finest stored bars rather than stored separately.
+
+The exception is a split or dividend: Yahoo then back-adjusts every
+earlier price, so when the fetched tail carries one the whole stored
+range is downloaded again. Stores older than MAX_AGE are rebuilt too,
+to pick up any other revision.
+"""
+import json
+import os
+import tempfile
+import threading
+import time as _time
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from .cache import market_ttl
+from .market_data import fetch_history, get_history
+from .resample import can_resample, resample
+
+STORE_DIR = os.environ.get('YFINAPI_BAR_STORE', os.path.join(tempfile.gettempdir(), 'yfinapi', 'bars'))
+
+BAR_DTYPE = np.dtype([
+    ('ts', 'i8'),  # UTC nanoseconds
+    ('open', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('close', 'f8'),
+    ('volume', 'i8'),
+])
+
+# How far back Yahoo serves each stored interval (None = no limit)
+STORED_INTERVALS = {
+    '1d': None,
+    '1m': 7,
+    '2m': 60,
+    '5m': 60,
+    '15m': 60,
+    '30m': 60,
+    '60m': 730,
+    '90m': 60,
+    '1h': 730,
+}
+
+# Intraday intervals derived locally from finer bars, finest source first.
+# A source is used when Yahoo serves it for the whole requested window, so
+# switching a chart between these intervals does not download anything new.
+DERIVED_INTERVALS = {
+    '5m': ('1m',),
+    '15m': ('1m',),
+    '30m': ('1m', '2m'),
+    '60m': ('1m', '2m'),
+    '90m': ('1m', '2m'),
+    '1h': ('1m', '2m'),
+}
+
+# Upstream periods no longer than any source's limit
+SHORT_PERIODS = ('1d', '5d')
+
+PERIOD_OFFSETS = {
+    '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3),
+    '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2),
+    '5y': pd.DateOffset(years=5),
+    '10y': pd.DateOffset(years=10),
+}
+
+DEFAULT_TZ = 'Asia/Kolkata'
+
+# Seconds after which a stored range is downloaded again in full
+MAX_AGE = int(os.environ.get('YFINAPI_BAR_STORE_MAX_AGE', 7 * 24 * 60 * 60))
+
+# Ticker.history() columns announcing a re-adjustment of earlier prices
+ACTION_COLUMNS = ('Dividends', 'Stock Splits')
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(key):
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def _paths(symbol, interval):
+    base = os.path.join(STORE_DIR, f"{quote(symbol, safe='')}_{interval}")
+    return base + '.npy', base + '.json'
+
+
+def _read(symbol, interval):
+    """Return (bars, meta); bars is a read-only memmap or None when nothing is stored"""
+    data_path, meta_path = _paths(symbol, interval)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        bars = np.load(data_path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None, {}
+    return bars, meta
+
+
+def _write(symbol, interval, bars, meta):
+    """Atomically replace the stored bars and metadata"""
+    os.makedirs(STORE_DIR, exist_ok=True)
+    data_path, meta_path = _paths(symbol, interval)
+
+    fd, tmp = tempfile.mkstemp(dir=STORE_DIR, suffix='.npy')
+    with os.fdopen(fd, 'wb') as f:
+        np.save(f, bars)
+    os.replace(tmp, data_path)
+
+    fd, tmp = tempfile.mkstemp(dir=STORE_DIR, suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, meta_path)
+
+
+def _to_bars(history):
+    """Convert a Ticker.history() frame into the structured bar array"""
+    bars = np.empty(len(history), dtype=BAR_DTYPE)
+    bars['ts'] = history.index.tz_convert('UTC').asi8 if history.index.tz else history.index.asi8
+    bars['open'] = history['Open'].to_numpy(dtype='float64')
+    bars['high'] = history['High'].to_numpy(dtype='float64')
+    bars['low'] = history['Low'].to_numpy(dtype='float64')
+    bars['close'] = history['Close'].to_numpy(dtype='float64')
+    bars['volume'] = history['Volume'].fillna(0).to_numpy(dtype='int64')
+    return bars
+
+
+def _last_action(history):
+    """UTC nanoseconds of the latest bar with a dividend or split, or -1"""
+    hits = [np.nan_to_num(history[column].to_numpy(dtype='float64')) != 0
+            for column in ACTION_COLUMNS if column in history]
+    if not hits:
+        return -1
+    hit = np.logical_or.reduce(hits)
+    if not hit.any():
+        return -1
+    index = history.index.tz_convert('UTC') if history.index.tz else history.index
+    return int(index.asi8[hit][-1])
+
+
+def _rebuild(symbol, interval, bars, meta, tz, now):
+    """Download the whole stored range again; returns (bars, meta)"""
+    limit = STORED_INTERVALS[interval]
+    if meta['covered_from'] is None and not limit:
+        fetched = fetch_history(symbol, period='max', interval=interval)
+    else:
+        start = pd.Timestamp(int(bars['ts'][0]), tz='UTC').tz_convert(tz)
+        if limit:
+            start = max(start, now - pd.Timedelta(days=limit - 1))
+        fetched = fetch_history(symbol, interval=interval, start=start.strftime('%Y-%m-%d'))
+    if fetched.empty:
+        return bars, meta
+
+    rebuilt = _to_bars(fetched)
+    if limit and meta['covered_from'] is not None:
+        # Older bars are out of Yahoo's reach and can no longer be adjusted
+        meta['covered_from'] = max(meta['covered_from'], int(rebuilt['ts'][0]))
+    meta['built_at'] = _time.time()
+    meta['actions_through'] = _last_action(fetched)
+    return rebuilt, meta
+
+
+def _to_frame(bars, tz):
+    """Convert a bar array slice back into a Ticker.history()-shaped frame"""
+    index = pd.DatetimeIndex(bars['ts'], tz='UTC').tz_convert(tz)
+    return pd.DataFrame({
+        'Open': np.asarray(bars['open']),
+        'High': np.asarray(bars['high']),
+        'Low': np.asarray(bars['low']),
+        'Close': np.asarray(bars['close']),
+        'Volume': np.asarray(bars['volume']),
+    }, index=index)
+
+
+def _merge(stored, fetched):
+    """Combine stored and fetched bars; fetched bars win inside their own time span"""
+    if stored is None or len(stored) == 0:
+        merged = fetched
+    else:
+        cut = np.searchsorted(stored['ts'], fetched['ts'][0], side='left')
+        tail = stored[np.searchsorted(stored['ts'], fetched['ts'][-1], side='right'):]
+        merged = np.concatenate([stored[:cut], fetched, tail])
+
+    # Keep the last copy of any duplicated timestamp
+    merged = np.sort(merged, order='ts', kind='stable')
+    keep = np.append(merged['ts'][1:] != merged['ts'][:-1], True)
+    return merged[keep]
+
+
+def _window(period, start, end, tz):
+    """Requested [lo, hi) as UTC nanoseconds; None means unbounded"""
+    if start and end:
+        lo = pd.Timestamp(start).tz_localize(tz)
+        hi = pd.Timestamp(end).tz_localize(tz)
+        return lo.value, hi.value
+
+    now = pd.Timestamp.now(tz=tz)
+    if period == 'max':
+        return None, None
+    if period == 'ytd':
+        return pd.Timestamp(year=now.year, month=1, day=1, tz=tz).value, None
+    # Yahoo's ranges start at midnight, so the first session is included
+    return (now - PERIOD_OFFSETS[period]).normalize().value, None
+
+
+def is_stored(period, interval, start=None, end=None):
+    """Whether a request can be served from the store"""
+    if interval not in STORED_INTERVALS:
+        return False
+    return bool(start and end) or period in PERIOD_OFFSETS or period in ('ytd', 'max')
+
+
+def derived_source(period, interval, start=None, end=None):
+    """The finer interval to resample interval from, or None to fetch it as is"""
+    sources = DERIVED_INTERVALS.get(interval, ())
+    if not sources:
+        return None
+    if period in SHORT_PERIODS and not (start and end):
+        return sources[0]
+    if not is_stored(period, interval, start, end):
+        return None
+    lo, _ = _window(period, start, end, DEFAULT_TZ)
+    if lo is None:
+        return None
+    now = pd.Timestamp.now(tz=DEFAULT_TZ)
+    for source in sources:
+        if lo >= (now - pd.Timedelta(days=STORED_INTERVALS[source] - 1)).normalize().value:
+            return source
+    return None
+
+
+def load_history(symbol, period="1mo", interval="1d", start=None, end=None):
+    """Drop-in for Ticker.history() backed by the on-disk store.
+
+    Intraday intervals in DERIVED_INTERVALS are resampled from the finest
+    bars available for the window. Short periods and aggregated intervals
+    (5d, 1wk, 1mo, ...) are passed straight through to the cached upstream
+    call.
+    """
+    source = derived_source(period, interval, start, end)
+    if source:
+        history = load_history(symbol, period=period, interval=source, start=start, end=end)
+        if history.empty:
+            return history
+        if can_resample(history, source, interval):
+            return resample(history, interval)
+        # Bins are only aligned for known sessions; fetch other exchanges as is
+
+    if not is_stored(period, interval, start, end):
+        return get_history(symbol, period=period, interval=interval, start=start, end=end)
+
+    with _lock_for((symbol, interval)):
+        bars, meta = _read(symbol, interval)
+        tz = meta.get('tz', DEFAULT_TZ)
+        lo, hi = _window(period, start, end, tz)
+        limit = STORED_INTERVALS[interval]
+        now = pd.Timestamp.now(tz=tz)
+
+        if bars is None or len(bars) == 0:
+            # Nothing stored yet: download exactly what was asked for
+            fetched = fetch_history(symbol, period=period, interval=interval, start=start, end=end)
+            if fetched.empty:
+                return fetched
+            tz = str(fetched.index.tz or tz)
+            bars = _to_bars(fetched)
+            meta = {
+                'tz': tz,
+                'covered_from': lo,
+                # A past start/end window says nothing about the bars after it
+                'fresh_until': _time.time() + market_ttl('history') if hi is None else 0,
+                'built_at': _time.time(),
+                'actions_through': _last_action(fetched),
+            }
+            _write(symbol, interval, bars, dict(meta, last_ts=int(bars['ts'][-1])))
+        else:
+            covered_from = meta['covered_from']
+            if covered_from is not None and (lo is None or lo < covered_from):
+                # Extend the stored range backwards up to the first stored bar
+                first_stored = pd.Timestamp(int(bars['ts'][0]), tz='UTC').tz_convert(tz)
+                if lo is None and not limit:
+                    fetched = fetch_history(symbol, period='max', interval=interval)
+                else:
+                    back_start = pd.Timestamp(lo, tz='UTC').tz_convert(tz) if lo is not None else now
+                    if limit:
+                        back_start = max(back_start, now - pd.Timedelta(days=limit - 1))
+                    if back_start < first_stored:
+                        fetched = fetch_history(symbol, interval=interval,
+                                                start=back_start.strftime('%Y-%m-%d'),
+                                                end=(first_stored + pd.Timedelta(days=1)).strftime('%Y-%m-%d'))
+                    else:
+                        fetched = pd.DataFrame()
+                if not fetched.empty:
+                    bars = _merge(bars, _to_bars(fetched))
+                meta['covered_from'] = lo
+                _write(symbol, interval, bars, dict(meta, last_ts=int(bars['ts'][-1])))
+
+            if (hi is None or hi > bars['ts'][-1]) and _time.time() >= meta.get('fresh_until', 0):
+                if _time.time() - meta.get('built_at', 0) >= MAX_AGE:
+                    bars, meta = _rebuild(symbol, interval, bars, meta, tz, now)
+                else:
+                    # Only the tail can have changed; refetch from the last stored bar onwards
+                    tail_start = pd.Timestamp(int(bars['ts'][-1]), tz='UTC').tz_convert(tz)
+                    if limit:
+                        tail_start = max(tail_start, now - pd.Timedelta(days=limit - 1))
+                    fetched = fetch_history(symbol, start=tail_start.strftime('%Y-%m-%d'), interval=interval)
+                    if _last_action(fetched) > meta.get('actions_through', -1):
+                        # A new split or dividend: every earlier price was adjusted
+                        bars, meta = _rebuild(symbol, interval, bars, meta, tz, now)
+                    elif not fetched.empty:
+                        bars = _merge(bars, _to_bars(fetched))
+                meta['fresh_until'] = _time.time() + market_ttl('history')
+                _write(symbol, interval, bars, dict(meta, last_ts=int(bars['ts'][-1])))
+
+    ts = bars['ts']
+    first = 0 if lo is None else np.searchsorted(ts, lo, side='left')
+    last = len(ts) if hi is None else np.searchsorted(ts, hi, side='left')
+    return _to_frame(bars[first:last], tz)
@@ -0,0 +1,62 @@
+"""Column-wise conversion of OHLCV frames into API records"""
+import numpy as np
+
+BAR_FIELDS = ['date', 'open', 'high', 'low', 'close', 'volume', 'change', 'change_percent']
+
+
+def format_dates(index, date_format='%Y-%m-%d'):
+    """Format a DatetimeIndex in exchange-local time.
+
+    Plain dates go through NumPy's datetime64 string conversion, which is
+    an order of magnitude faster than DatetimeIndex.strftime.
+    """
+    if date_format == '%Y-%m-%d':
+        local = index.tz_localize(None) if index.tz is not None else index
+        return local.values.astype('datetime64[D]').astype(str)
+    return index.strftime(date_format)
+
+
+def bar_columns(history, date_format='%Y-%m-%d'):
+    """Rounded response columns for every bar, computed as whole arrays"""
+    opens = history['Open'].to_numpy(dtype='float64')
+    closes = history['Close'].to_numpy(dtype='float64')
+    change = closes - opens
+
+    return {
+        'date': format_dates(history.index, date_format),
+        'open': np.round(opens, 2),
+        'high': np.round(history['High'].to_numpy(dtype='float64'), 2),
+        'low': np.round(history['Low'].to_numpy(dtype='float64'), 2),
+        'close': np.round(closes, 2),
+        'volume': history['Volume'].fillna(0).to_numpy(dtype='int64'),
+        'change': np.round(change, 2),
+        'change_percent': np.round(change / opens * 100, 2)
+    }
+
+
+def bar_records(history, date_format='%Y-%m-%d'):
+    """List of per-bar dicts, as returned by /api/stock/historical"""
+    columns = bar_columns(history, date_format)
+    values = [columns[field].tolist() for field in BAR_FIELDS]
+    return [dict(zip(BAR_FIELDS, row)) for row in zip(*values)]
+
+
+def bar_summary(history):
+    """Summary statistics over the rounded closes and volumes"""
+    closes = np.round(history['Close'].to_numpy(dtype='float64'), 2)
+    first, last = float(closes[0]), float(closes[-1])
+
+    return {
+        "highest_price": float(closes.max()),
+        "lowest_price": float(closes.min()),
+        "average_price": round(float(closes.mean()), 2),
+        "total_volume": int(history['Volume'].fillna(0).to_numpy(dtype='int64').sum()),
+        "price_change": round(last - first, 2),
+        "price_change_percent": round(((last - first) / first) * 100, 2)
+    }
+
+
+def iter_bar_records(history, chunk_size=5000, date_format='%Y-%m-%d'):
+    """Yield per-bar dicts, vectorizing one slice of the frame at a time"""
+    for start in range(0, len(history), chunk_size):
+        yield from bar_records(history.iloc[start:start + chunk_size], date_format)
@@ -0,0 +1,176 @@
+"""In-process LRU cache with per-entry TTLs.
+
+Warm serverless instances live for minutes, so anything cached here is
+shared by every request that lands on the same instance. Concurrent
+misses for the same key share a single upstream call, and expired
+entries are kept around for a while so they can be served while one
+background refresh runs, or when Yahoo errors.
+"""
+import os
+import threading
+import time as _time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .market_hours import MARKET_CLOSE, is_market_open, now_ist, seconds_until_next_open
+
+CACHE_SIZE = int(os.environ.get('YFINAPI_CACHE_SIZE', 1024))
+
+# TTL (seconds) per data kind while the market is open
+OPEN_TTLS = {
+    'history': int(os.environ.get('YFINAPI_HISTORY_TTL', 5)),
+    'download': int(os.environ.get('YFINAPI_HISTORY_TTL', 5)),
+    'info': int(os.environ.get('YFINAPI_INFO_TTL', 60)),
+    # Rebuild cadence of the market snapshot behind the movers endpoints
+    'snapshot': int(os.environ.get('YFINAPI_SNAPSHOT_TTL', 15)),
+    # Vercel edge / CDN cache, see responses.cache_control()
+    'edge': int(os.environ.get('YFINAPI_EDGE_TTL', 15)),
+}
+
+# TTL (seconds) for company metadata (names, sector, ratios), whatever the session
+METADATA_TTL = int(os.environ.get('YFINAPI_METADATA_TTL', 6 * 60 * 60))
+
+# Seconds past expiry an entry is served immediately while it refreshes
+STALE_WHILE_REVALIDATE = int(os.environ.get('YFINAPI_STALE_WHILE_REVALIDATE', 60))
+
+# Seconds past expiry an entry is still served when the refresh fails
+STALE_IF_ERROR = int(os.environ.get('YFINAPI_STALE_IF_ERROR', 24 * 60 * 60))
+
+# Yahoo keeps revising the last bar for a few minutes after the close
+SETTLE_SECONDS = 15 * 60
+
+_MISSING = object()
+
+
+def _has_data(value):
+    """False for None, empty dicts and empty DataFrames"""
+    empty = getattr(value, 'empty', None)
+    if empty is not None:
+        return not empty
+    return bool(value)
+
+
+class TTLCache:
+    """Thread-safe LRU mapping whose entries expire individually"""
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> (value, fresh_until)
+        self._inflight = {}  # key -> Future of the running load
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=4, thread_name_prefix='cache-refresh')
+
+    def get(self, key, default=None):
+        """Fresh value for key, or default when missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= _time.monotonic():
+                return default
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, _time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        # Caller holds the lock
+        now = _time.monotonic()
+        for key in [k for k, (_, fresh_until) in self._data.items() if fresh_until + STALE_IF_ERROR <= now]:
+            del self._data[key]
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get_or_load(self, key, loader, ttl, should_cache=_has_data):
+        """Return the cached value for key, calling loader() on a miss.
+
+        - Fresh entries are returned as is.
+        - Entries that expired less than STALE_WHILE_REVALIDATE seconds
+          ago are returned immediately and refreshed in the background.
+        - Concurrent misses for the same key wait on one loader() call.
+        - If loader() raises, or returns a value that should_cache()
+          rejects, an entry that expired less than STALE_IF_ERROR
+          seconds ago is returned instead.
+
+        Values for which should_cache(value) is false (empty frames,
+        empty info dicts) are returned but not stored.
+        """
+        now = _time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, fresh_until = entry
+                if now < fresh_until:
+                    self._data.move_to_end(key)
+                    return value
+                if now >= fresh_until + STALE_IF_ERROR:
+                    entry = None
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = Future()
+
+        if entry is not None and now < entry[1] + STALE_WHILE_REVALIDATE:
+            if leader:
+                self._refresher.submit(self._load, key, loader, ttl, should_cache, flight)
+            return entry[0]
+
+        try:
+            value = self._load(key, loader, ttl, should_cache, flight) if leader else flight.result()
+        except Exception:
+            if entry is not None:
+                return entry[0]
+            raise
+        # An empty result is usually Yahoo failing quietly
+        if entry is not None and not should_cache(value):
+            return entry[0]
+        return value
+
+    def _load(self, key, loader, ttl, should_cache, flight):
+        """Run loader() for the in-flight future of key and publish the outcome"""
+        try:
+            value = loader()
+            if should_cache(value):
+                self.set(key, value, ttl)
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def market_ttl(kind, now=None):
+    """TTL for a data kind based on the IST session.
+
+    A few seconds while the market is open (and shortly after the close
+    while the final bar settles), otherwise until the next 09:15 open.
+    """
+    now = now or now_ist()
+    if is_market_open(now):
+        return OPEN_TTLS[kind]
+
+    close = now.replace(hour=MARKET_CLOSE.hour, minute=MARKET_CLOSE.minute, second=0, microsecond=0)
+    if now.weekday() < 5 and 0 <= (now - close).total_seconds() < SETTLE_SECONDS:
+        return OPEN_TTLS[kind]
+
+    return seconds_until_next_open(now)
+
+
+# Process-wide cache shared by every handler on a warm instance
+cache = TTLCache()
@@ -0,0 +1,73 @@
+"""Bounded-parallel executor for per-symbol upstream calls"""
+import os
+import threading
+import time as _time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+MAX_WORKERS = int(os.environ.get('YFINAPI_FETCH_WORKERS', 8))
+
+# Seconds a single call may run before it is given up on
+ITEM_TIMEOUT = float(os.environ.get('YFINAPI_FETCH_TIMEOUT', 10))
+
+# Seconds the whole batch may take, kept under the Vercel function timeout
+DEADLINE = float(os.environ.get('YFINAPI_FETCH_DEADLINE', 8))
+
+
+def fetch_all(fn, items, max_workers=MAX_WORKERS, timeout=ITEM_TIMEOUT, deadline=DEADLINE):
+    """Call fn(item) for every item with at most max_workers running at once.
+
+    Returns (results, errors), both dicts keyed by item. A call that runs
+    longer than timeout, or is still pending when the deadline passes, is
+    reported in errors and left to finish in the background, so latency is
+    bounded by the deadline rather than by the slowest call.
+    """
+    items = list(dict.fromkeys(items))
+    results, errors = {}, {}
+    if not items:
+        return results, errors
+
+    started = {}
+    started_lock = threading.Lock()
+
+    def run(item):
+        with started_lock:
+            started[item] = _time.monotonic()
+        return fn(item)
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(items)))
+    pending = {executor.submit(run, item): item for item in items}
+    give_up_at = _time.monotonic() + deadline
+
+    try:
+        while pending:
+            now = _time.monotonic()
+            if now >= give_up_at:
+                break
+
+            # Wake up for the next completion, item timeout or the deadline
+            with started_lock:
+                running = [started[item] + timeout for item in pending.values() if item in started]
+            wake_at = min(running + [give_up_at])
+            done, _ = wait(pending, timeout=max(wake_at - now, 0), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                item = pending.pop(future)
+                try:
+                    results[item] = future.result()
+                except Exception as e:
+                    errors[item] = str(e)
+
+            now = _time.monotonic()
+            with started_lock:
+                expired = [f for f, item in pending.items() if item in started and now - started[item] >= timeout]
+            for future in expired:
+                errors[pending.pop(future)] = f"timed out after {timeout:g}s"
+
+        for future, item in pending.items():
+            future.cancel()
+            errors[item] = f"deadline of {deadline:g}s exceeded"
+    finally:
+        # Do not block the response on calls we have given up on
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results, errors
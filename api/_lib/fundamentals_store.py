@@ -0,0 +1,196 @@
+"""Persistent SQLite store behind /api/fundamentals.
+
+Company info and the annual statements only change when a company
+reports, so each (symbol, source) is kept as one row and refetched only
+when a newer period is due to have been published, or when the row is
+older than the configured max age. In the steady state a request is a
+local read with no upstream calls.
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time as _time
+
+import pandas as pd
+
+from .fetcher import fetch_all
+from .market_data import fetch_fundamentals
+
+DB_PATH = os.environ.get('YFINAPI_FUNDAMENTALS_DB',
+                         os.path.join(tempfile.gettempdir(), 'yfinapi', 'fundamentals.sqlite3'))
+
+# Seconds after which a stored statement is refetched even if no new period is due
+MAX_AGE = int(os.environ.get('YFINAPI_FUNDAMENTALS_MAX_AGE', 90 * 24 * 60 * 60))
+
+# info also carries ratios and analyst targets, so it is kept for less (its prices
+# are served live by /api/fundamentals)
+INFO_MAX_AGE = int(os.environ.get('YFINAPI_FUNDAMENTALS_INFO_MAX_AGE', 24 * 60 * 60))
+
+# Once a new period is due, how often to check whether it has been published
+RECHECK_SECONDS = 24 * 60 * 60
+
+SOURCES = ('info', 'financials', 'balance_sheet', 'cashflow')
+
+# Period length and publication lag (SEBI LODR: 45 days for quarterly
+# results, 60 days for audited annual results) per source
+PERIODS = {
+    'info': (pd.DateOffset(months=3), pd.Timedelta(days=45)),
+    'financials': (pd.DateOffset(years=1), pd.Timedelta(days=60)),
+    'balance_sheet': (pd.DateOffset(years=1), pd.Timedelta(days=60)),
+    'cashflow': (pd.DateOffset(years=1), pd.Timedelta(days=60)),
+}
+
+_local = threading.local()
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(key):
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def _connect():
+    """Per-thread connection, creating the database on first use"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+        conn = sqlite3.connect(DB_PATH, timeout=10)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS fundamentals (
+                symbol TEXT NOT NULL,
+                source TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                period_end TEXT,
+                fetched_at REAL NOT NULL,
+                next_due REAL,
+                PRIMARY KEY (symbol, source)
+            )
+        """)
+        _local.conn = conn
+    return conn
+
+
+def _encode(source, value):
+    if source == 'info':
+        return json.dumps(value, default=str)
+    return json.dumps({
+        'columns': [column.isoformat() for column in value.columns],
+        'index': [str(row) for row in value.index],
+        'data': value.astype('float64').to_numpy().tolist(),
+    })
+
+
+def _decode(source, payload):
+    data = json.loads(payload)
+    if source == 'info':
+        return data
+    return pd.DataFrame(data['data'], index=data['index'],
+                        columns=pd.DatetimeIndex(data['columns']), dtype='float64')
+
+
+def _period_end(source, value):
+    """End date of the latest reported period, or None when unknown"""
+    if source == 'info':
+        quarter = value.get('mostRecentQuarter')
+        return pd.Timestamp(quarter, unit='s') if isinstance(quarter, (int, float)) else None
+    if value.empty:
+        return None
+    return max(pd.Timestamp(column) for column in value.columns)
+
+
+def _next_due(source, period_end):
+    """Unix time by which the period after period_end should have been published"""
+    if period_end is None:
+        return None
+    length, lag = PERIODS[source]
+    return (period_end + length + lag).timestamp()
+
+
+def is_stale(source, fetched_at, next_due, now=None):
+    """Whether a stored row should be refetched"""
+    now = now or _time.time()
+    max_age = INFO_MAX_AGE if source == 'info' else MAX_AGE
+    if now - fetched_at >= max_age:
+        return True
+    return next_due is not None and now >= next_due and now - fetched_at >= RECHECK_SECONDS
+
+
+def read(symbol, source):
+    """Return (value, fetched_at, next_due) from the store, or (None, None, None)"""
+    row = _connect().execute(
+        'SELECT payload, fetched_at, next_due FROM fundamentals WHERE symbol = ? AND source = ?',
+        (symbol, source)).fetchone()
+    if row is None:
+        return None, None, None
+    return _decode(source, row[0]), row[1], row[2]
+
+
+def read_stored(symbols, source):
+    """{symbol: stored value} for those of symbols the store has, fresh or not; never calls Yahoo"""
+    wanted = set(symbols)
+    rows = _connect().execute('SELECT symbol, payload FROM fundamentals WHERE source = ?', (source,))
+    return {symbol: _decode(source, payload) for symbol, payload in rows if symbol in wanted}
+
+
+def write(symbol, source, value):
+    period_end = _period_end(source, value)
+    conn = _connect()
+    with conn:
+        conn.execute(
+            'INSERT OR REPLACE INTO fundamentals VALUES (?, ?, ?, ?, ?, ?)',
+            (symbol, source, _encode(source, value),
+             period_end.strftime('%Y-%m-%d') if period_end is not None else None,
+             _time.time(), _next_due(source, period_end)))
+
+
+def refresh(symbol, source):
+    """Fetch one source from Yahoo and store it; raises when Yahoo returns nothing"""
+    value = fetch_fundamentals(symbol, source)
+    if value is None or (source == 'info' and not value) or (source != 'info' and value.empty):
+        raise LookupError(f"{symbol}: Yahoo returned no {source}")
+    write(symbol, source, value)
+    return value
+
+
+def load_fundamentals(symbol, source):
+    """Stored info dict or statement frame, refreshed when a new period is due.
+
+    When the refresh fails, the stored (stale) copy is returned instead.
+    """
+    value, fetched_at, next_due = read(symbol, source)
+    if value is not None and not is_stale(source, fetched_at, next_due):
+        return value
+
+    with _lock_for((symbol, source)):
+        # Another request may have refreshed it while we waited
+        stored, fetched_at, next_due = read(symbol, source)
+        if stored is not None and not is_stale(source, fetched_at, next_due):
+            return stored
+        try:
+            return refresh(symbol, source)
+        except Exception:
+            if stored is not None:
+                return stored
+            raise
+
+
+def needs_refresh(symbol, source):
+    """Whether (symbol, source) is missing from the store or stale"""
+    value, fetched_at, next_due = read(symbol, source)
+    return value is None or is_stale(source, fetched_at, next_due)
+
+
+def refresh_all(symbols, sources=SOURCES, force=False, max_workers=4, timeout=60, deadline=3600):
+    """Refresh every missing or stale (symbol, source) pair, for the background job.
+
+    Returns (refreshed, errors), both keyed by (symbol, source).
+    """
+    pairs = [(symbol, source) for symbol in symbols for source in sources]
+    if not force:
+        pairs = [pair for pair in pairs if needs_refresh(*pair)]
+    return fetch_all(lambda pair: refresh(*pair), pairs,
+                     max_workers=max_workers, timeout=timeout, deadline=deadline)
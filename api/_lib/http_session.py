@@ -0,0 +1,71 @@
+"""Pooled keep-alive HTTP session passed to every yfinance call.
+
+Without a session, yfinance 0.2.x sends each request through the bare
+requests.get(), which opens (and TLS-negotiates) a new connection every
+time. This module-level session lives as long as the warm instance, so
+requests reuse open connections to Yahoo from the pool, and Yahoo's
+cookies stay in its cookie jar instead of being handed out anew on
+every call. See benchmarks/http_session.py for the handshake savings.
+
+requests is imported with the first session, so endpoints that never
+reach Yahoo do not pay for it at cold start.
+
+Throttled (429) and failed (5xx) responses are raised by a response
+hook, so upstream.call() can retry them even where yfinance would
+swallow the error.
+
+YFINAPI_RECORD_DIR and YFINAPI_UPSTREAM_URL switch the session to the
+record and replay transports of replay.py.
+"""
+import os
+import threading
+
+from .fetcher import MAX_WORKERS
+from .upstream import raise_for_throttling
+
+# Open connections kept per host; yf.download runs up to one request per CPU
+# thread next to the fetch_all workers, so leave room for both
+POOL_SIZE = int(os.environ.get('YFINAPI_HTTP_POOL_SIZE', max(MAX_WORKERS, (os.cpu_count() or 1) * 2, 10)))
+
+# Yahoo hosts behind the chart, quote and fundamentals endpoints
+POOL_HOSTS = 4
+
+# Save every Yahoo response as a fixture in this directory
+RECORD_DIR = os.environ.get('YFINAPI_RECORD_DIR')
+
+# Send Yahoo requests to this stand-in server instead, e.g. http://127.0.0.1:8765
+UPSTREAM_URL = os.environ.get('YFINAPI_UPSTREAM_URL')
+
+
+def make_session(pool_size=POOL_SIZE):
+    """requests.Session keeping up to pool_size idle connections per host"""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    pool = {'pool_connections': POOL_HOSTS, 'pool_maxsize': pool_size}
+    if UPSTREAM_URL:
+        from .replay import RedirectAdapter
+        adapter = RedirectAdapter(UPSTREAM_URL, **pool)
+    elif RECORD_DIR:
+        from .replay import RecordingAdapter
+        adapter = RecordingAdapter(RECORD_DIR, **pool)
+    else:
+        adapter = HTTPAdapter(**pool)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.hooks['response'].append(raise_for_throttling)
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """The process-wide session, shared by every handler on a warm instance"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = make_session()
+        return _session
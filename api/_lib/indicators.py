@@ -0,0 +1,268 @@
+"""Vectorized technical indicators with memoized, incrementally extended results.
+
+Every indicator is written as extend(state, bars) -> (columns, state):
+given the state left after earlier bars, it computes the values for the
+new bars only, as whole arrays. The first computation is simply an
+extension of no state. Results and state are memoized per (symbol,
+interval, base window, indicator) for every bar except the last, which
+Yahoo keeps revising, so a request after a new bar only computes the
+new bars instead of the whole series.
+"""
+import numpy as np
+import pandas as pd
+
+from .bar_store import is_stored, load_history
+from .cache import cache
+
+# name -> (default parameters, parameter types)
+INDICATORS = {
+    'sma': ((20,), (int,)),
+    'ema': ((20,), (int,)),
+    'rsi': ((14,), (int,)),
+    'macd': ((12, 26, 9), (int, int, int)),
+    'bbands': ((20, 2.0), (int, float)),
+    'atr': ((14,), (int,)),
+}
+
+# Bars of history computed for daily and longer intervals, so long
+# averages are warmed up at the start of the requested window
+BASE_PERIODS = {'1d': '2y', '5d': '5y', '1wk': '5y', '1mo': '10y', '3mo': 'max'}
+
+PERIOD_ORDER = ['1d', '5d', '1mo', '3mo', '6mo', 'ytd', '1y', '2y', '5y', '10y', 'max']
+
+MAX_LENGTH = 500
+
+# Up to this many new values are smoothed in a plain loop rather than with ewm()
+SHORT_TAIL = 16
+
+# Memoized state is rebuilt from the store after this long without use
+MEMO_TTL = 24 * 60 * 60
+
+
+def parse_indicators(value):
+    """[(name, params)] from 'rsi:14,ema:50,macd', or raise ValueError"""
+    specs = []
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        name, *args = item.strip().lower().split(':')
+        if name not in INDICATORS:
+            raise ValueError(f"Unknown indicator: {name}. Available indicators: {', '.join(INDICATORS)}")
+        defaults, types = INDICATORS[name]
+        if len(args) > len(defaults):
+            raise ValueError(f"{name} takes at most {len(defaults)} parameters")
+        try:
+            params = tuple(kind(arg) for kind, arg in zip(types, args)) + defaults[len(args):]
+        except ValueError:
+            raise ValueError(f"Invalid parameters for {name}: {':'.join(args)}")
+        if not all(0 < param <= MAX_LENGTH for param in params):
+            raise ValueError(f"Parameters of {name} must be between 1 and {MAX_LENGTH}")
+        specs.append((name, params))
+    if not specs:
+        raise ValueError("indicators parameter is required, e.g. rsi:14,ema:50")
+    return list(dict.fromkeys(specs))
+
+
+def column_prefix(name, params):
+    """'rsi_14', 'macd_12_26_9', 'bbands_20_2'"""
+    return '_'.join([name] + [f'{param:g}' for param in params])
+
+
+def _smooth(values, alpha, length, state):
+    """Exponential smoothing seeded with the mean of the first length values.
+
+    state is {'value': last smoothed value} once seeded, or {'pending':
+    values seen so far} before. Leading NaNs are not part of the series.
+    """
+    out = np.full(len(values), np.nan)
+    valid = np.flatnonzero(~np.isnan(values))
+    series = values[valid]
+    state = state or {'pending': np.empty(0)}
+
+    if 'value' in state:
+        previous, start = state['value'], 0
+    else:
+        pending = np.concatenate([state['pending'], series])
+        if len(pending) < length:
+            return out, {'pending': pending}
+        seed_at = length - 1 - len(state['pending'])
+        previous, start = pending[:length].mean(), seed_at + 1
+        out[valid[seed_at]] = previous
+
+    tail = series[start:]
+    if len(tail) > SHORT_TAIL:
+        smoothed = pd.Series(np.concatenate([[previous], tail])).ewm(
+            alpha=alpha, adjust=False).mean().to_numpy()[1:]
+        out[valid[start:]] = smoothed
+        previous = smoothed[-1]
+    else:
+        # A bar or two since the memo; not worth building a Series for
+        for position, value in zip(valid[start:], tail):
+            previous = previous + alpha * (value - previous)
+            out[position] = previous
+    return out, {'value': previous}
+
+
+def _with_lookback(state, closes, length):
+    """The last length - 1 closes of earlier bars followed by the new closes, and how many were prepended"""
+    before = state['closes'] if state else np.empty(0)
+    return np.concatenate([before, closes]), len(before)
+
+
+def _sma(state, bars, length):
+    closes, skip = _with_lookback(state, bars['close'], length)
+    mean = pd.Series(closes).rolling(length).mean().to_numpy()[skip:]
+    return {'': mean}, {'closes': closes[-(length - 1):] if length > 1 else np.empty(0)}
+
+
+def _ema(state, bars, length):
+    values, state = _smooth(bars['close'], 2 / (length + 1), length, state)
+    return {'': values}, state
+
+
+def _rsi(state, bars, length):
+    """Wilder's RSI"""
+    state = state or {}
+    closes = bars['close']
+    previous = np.concatenate([[state.get('last_close', np.nan)], closes[:-1]])
+    change = closes - previous
+    gains, gain_state = _smooth(np.where(np.isnan(change), np.nan, np.maximum(change, 0)),
+                                1 / length, length, state.get('gain'))
+    losses, loss_state = _smooth(np.where(np.isnan(change), np.nan, np.maximum(-change, 0)),
+                                 1 / length, length, state.get('loss'))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(losses == 0, 100.0, 100 - 100 / (1 + gains / losses))
+    rsi[np.isnan(gains)] = np.nan
+    return {'': rsi}, {'last_close': closes[-1], 'gain': gain_state, 'loss': loss_state}
+
+
+def _macd(state, bars, fast, slow, signal):
+    state = state or {}
+    fast_ema, fast_state = _smooth(bars['close'], 2 / (fast + 1), fast, state.get('fast'))
+    slow_ema, slow_state = _smooth(bars['close'], 2 / (slow + 1), slow, state.get('slow'))
+    macd = fast_ema - slow_ema
+    signal_line, signal_state = _smooth(macd, 2 / (signal + 1), signal, state.get('signal'))
+    columns = {'': macd, '_signal': signal_line, '_histogram': macd - signal_line}
+    return columns, {'fast': fast_state, 'slow': slow_state, 'signal': signal_state}
+
+
+def _bbands(state, bars, length, width):
+    closes, skip = _with_lookback(state, bars['close'], length)
+    rolling = pd.Series(closes).rolling(length)
+    middle = rolling.mean().to_numpy()[skip:]
+    spread = width * rolling.std(ddof=0).to_numpy()[skip:]
+    columns = {'_upper': middle + spread, '_middle': middle, '_lower': middle - spread}
+    return columns, {'closes': closes[-(length - 1):] if length > 1 else np.empty(0)}
+
+
+def _atr(state, bars, length):
+    """Wilder's average true range; the very first bar's range is high - low"""
+    state = state or {}
+    high, low, closes = bars['high'], bars['low'], bars['close']
+    previous = np.concatenate([[state.get('last_close', np.nan)], closes[:-1]])
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - previous), np.abs(low - previous)))
+    atr, smooth_state = _smooth(true_range, 1 / length, length, state.get('atr'))
+    return {'': atr}, {'last_close': closes[-1], 'atr': smooth_state}
+
+
+_EXTEND = {'sma': _sma, 'ema': _ema, 'rsi': _rsi, 'macd': _macd, 'bbands': _bbands, 'atr': _atr}
+
+
+def _bars(history):
+    """The columns the indicators read, as arrays"""
+    return {
+        'ts': history.index.asi8,
+        'close': history['Close'].to_numpy(dtype='float64'),
+        'high': history['High'].to_numpy(dtype='float64'),
+        'low': history['Low'].to_numpy(dtype='float64'),
+    }
+
+
+def _extend(memo, name, params, bars):
+    """Columns for every bar, reusing memo when it covers a prefix of the bars"""
+    ts = bars['ts']
+    extend = lambda state, rows: _EXTEND[name](state, {key: values[rows] for key, values in bars.items()}, *params)
+
+    committed = len(ts) - 1
+    # Closes are compared too: after a split or dividend the store is rebuilt with new prices
+    if (memo is None or len(memo['ts']) > committed or not np.array_equal(ts[:len(memo['ts'])], memo['ts'])
+            or not np.array_equal(bars['close'][:len(memo['ts'])], memo['close'])):
+        memo = {'ts': ts[:0], 'close': bars['close'][:0], 'columns': None, 'state': None}
+
+    done = len(memo['ts'])
+    if done < committed:
+        # Bars that are new since the memo, computed from its state only
+        new_columns, state = extend(memo['state'], slice(done, committed))
+        columns = new_columns if memo['columns'] is None else {
+            key: np.concatenate([memo['columns'][key], values]) for key, values in new_columns.items()}
+        memo = {'ts': ts[:committed], 'close': bars['close'][:committed], 'columns': columns, 'state': state}
+
+    # The last bar is recomputed whenever it changes, but never becomes state
+    last_bar = (bars['high'][-1], bars['low'][-1], bars['close'][-1])
+    cached = memo.get('last')
+    if cached is not None and cached[0] == ts[-1] and cached[1] == last_bar:
+        return memo, cached[2]
+
+    last_columns, _ = extend(memo['state'], slice(committed, len(ts)))
+    if memo['columns'] is not None:
+        last_columns = {key: np.concatenate([memo['columns'][key], last_columns[key]]) for key in last_columns}
+    return dict(memo, last=(ts[-1], last_bar, last_columns)), last_columns
+
+
+def compute_indicators(symbol, specs, history, base_key, interval):
+    """{column name: values aligned with history} for every (name, params) spec"""
+    columns = {}
+    if history.empty:
+        return columns
+    bars = _bars(history)
+    for name, params in specs:
+        key = (symbol, f'indicator:{column_prefix(name, params)}', base_key, interval)
+        memo, values = _extend(cache.get(key), name, params, bars)
+        cache.set(key, memo, MEMO_TTL)
+        prefix = column_prefix(name, params)
+        for suffix, column in values.items():
+            columns[prefix + suffix] = column
+    return columns
+
+
+def base_period(period, interval):
+    """The period indicators are computed over: the requested one, widened to warm up long averages"""
+    base = BASE_PERIODS.get(interval)
+    if base is None or period not in PERIOD_ORDER:
+        return period
+    return max(period, base, key=PERIOD_ORDER.index)
+
+
+def get_indicators(symbol, specs, period="1y", interval="1d", start=None, end=None):
+    """(history, columns) for the requested window, computed over a warmed-up base window"""
+    if start and end:
+        history = load_history(symbol, interval=interval, start=start, end=end)
+        return history, compute_indicators(symbol, specs, history, f"{start}:{end}", interval)
+
+    base = base_period(period, interval)
+    history = load_history(symbol, period=base, interval=interval)
+    if history.empty:
+        return history, {}
+
+    # The base window slides forward with the clock, and a memo only helps
+    # while it covers a prefix of the bars. So stored bars keep the window
+    # start the memos were computed from (until they expire) and only grow.
+    extended = False
+    if is_stored(base, interval):
+        anchor_key = (symbol, 'indicator-anchor', base, interval)
+        anchor = cache.get(anchor_key)
+        extended = anchor is not None and anchor < history.index.asi8[0]
+        if extended:
+            tz = history.index.tz
+            history = load_history(symbol, interval=interval,
+                                   start=pd.Timestamp(anchor, tz='UTC').tz_convert(tz).strftime('%Y-%m-%d'),
+                                   end=(pd.Timestamp.now(tz=tz) + pd.Timedelta(days=1)).strftime('%Y-%m-%d'))
+        cache.set(anchor_key, int(history.index.asi8[0]), MEMO_TTL)
+
+    columns = compute_indicators(symbol, specs, history, base, interval)
+    if base == period and not extended:
+        return history, columns
+
+    window = load_history(symbol, period=period, interval=interval)
+    first = np.searchsorted(history.index.asi8, window.index.asi8[0]) if not window.empty else len(history)
+    return history.iloc[first:], {key: values[first:] for key, values in columns.items()}
@@ -0,0 +1,112 @@
+"""Cached access to per-symbol Yahoo data.
+
+Every yf.Ticker(...).history() / .info call made by the handlers goes
+through here, keyed by (symbol, data kind, period, interval), and
+reaches Yahoo under the shared rate limit and circuit breaker, over
+the pooled keep-alive session. yfinance is only imported for the first
+upstream call, so requests served from the cache or the local stores
+never load it.
+"""
+from .cache import METADATA_TTL, cache, market_ttl
+from .http_session import get_session
+from .upstream import UpstreamError, call, is_transient
+
+
+def _ticker(symbol):
+    """yf.Ticker on the pooled session"""
+    import yfinance as yf
+    return yf.Ticker(symbol, session=get_session())
+
+
+def _no_data(error):
+    """Whether a failed call means Yahoo answered without data, rather than failed"""
+    return not isinstance(error, UpstreamError) and not is_transient(error)
+
+
+def _empty_history():
+    from yfinance.utils import empty_df
+    return empty_df()
+
+
+def fetch_history(symbol, **kwargs):
+    """Uncached Ticker.history(), for callers that keep their own storage.
+
+    An unknown symbol or an empty window gives an empty frame; throttling
+    and outages are raised once the retries are spent.
+    """
+    try:
+        return call(_ticker(symbol).history, raise_errors=True, **kwargs)
+    except Exception as e:
+        if not _no_data(e):
+            raise
+        return _empty_history()
+
+
+def _load_fundamentals(symbol, source):
+    value = getattr(_ticker(symbol), source)
+    if value is None or len(value) == 0:
+        raise LookupError(f"{symbol}: Yahoo returned no {source}")
+    return value
+
+
+def fetch_fundamentals(symbol, source):
+    """Uncached Ticker.info, .financials, .balance_sheet or .cashflow; raises when Yahoo returns nothing"""
+    return call(_load_fundamentals, symbol, source)
+
+
+def get_history(symbol, period="1mo", interval="1d", start=None, end=None):
+    """Ticker.history() for a period, or for a start/end window when both are given"""
+    if start and end:
+        key = (symbol, 'history', f"{start}:{end}", interval)
+        loader = lambda: fetch_history(symbol, start=start, end=end, interval=interval)
+    else:
+        key = (symbol, 'history', period, interval)
+        loader = lambda: fetch_history(symbol, period=period, interval=interval)
+
+    return cache.get_or_load(key, loader, market_ttl('history'))
+
+
+def get_info(symbol):
+    """Ticker.info"""
+    key = (symbol, 'info', None, None)
+    return cache.get_or_load(key, lambda: fetch_fundamentals(symbol, 'info'), market_ttl('info'))
+
+
+
+def get_company_info(symbol):
+    """Ticker.info kept for METADATA_TTL, for callers that only read company metadata"""
+    key = (symbol, 'metadata', None, None)
+    return cache.get_or_load(key, lambda: fetch_fundamentals(symbol, 'info'), METADATA_TTL)
+
+
+def _load_quote(symbol):
+    ticker = _ticker(symbol)
+    history = ticker.history(period="1d", raise_errors=True)
+
+    # history() has already fetched the chart metadata, so neither of these
+    # makes another request (fast_info.exchange would fetch a year of prices)
+    metadata = ticker.get_history_metadata() or {}
+    return history, {
+        'name': metadata.get('longName') or metadata.get('shortName') or symbol,
+        'exchange': metadata.get('exchangeName', ''),
+        'currency': ticker.fast_info.currency or 'INR',
+    }
+
+
+def get_quote(symbol):
+    """(last session bars, {name, exchange, currency}) from a single chart request.
+
+    The lean alternative to get_info() + get_history() for callers that
+    need a price but no company metadata.
+    """
+    def load():
+        try:
+            return call(_load_quote, symbol)
+        except Exception as e:
+            if not _no_data(e):
+                raise
+            return _empty_history(), {}
+
+    key = (symbol, 'quote', '1d', '1d')
+    return cache.get_or_load(key, load, market_ttl('history'),
+                             should_cache=lambda quote: not quote[0].empty)
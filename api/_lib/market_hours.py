@@ -0,0 +1,59 @@
+"""NSE/BSE trading session helpers (all times IST)"""
+from datetime import datetime, time, timedelta
+import pytz
+
+IST = pytz.timezone('Asia/Kolkata')
+
+# NSE/BSE market hours (IST)
+MARKET_OPEN = time(9, 15)  # 9:15 AM
+MARKET_CLOSE = time(15, 30)  # 3:30 PM
+
+
+def now_ist():
+    """Current time in the Indian market timezone"""
+    return datetime.now(IST)
+
+
+def market_status(now=None):
+    """Return (status, reason) for the given IST time, e.g. ("OPEN", "Regular trading hours")"""
+    now = now or now_ist()
+
+    if now.weekday() >= 5:  # Saturday = 5, Sunday = 6
+        return "CLOSED", "Weekend"
+    if MARKET_OPEN <= now.time() <= MARKET_CLOSE:
+        return "OPEN", "Regular trading hours"
+    return "CLOSED", "Outside trading hours"
+
+
+def is_market_open(now=None):
+    """True during the 09:15-15:30 IST weekday session"""
+    return market_status(now)[0] == "OPEN"
+
+
+def next_market_open(now=None):
+    """Datetime of the next 09:15 IST session open (skip weekends)"""
+    now = now or now_ist()
+
+    candidate = now.replace(hour=MARKET_OPEN.hour, minute=MARKET_OPEN.minute, second=0, microsecond=0)
+    if candidate <= now:
+        candidate += timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate += timedelta(days=1)
+
+    return candidate
+
+
+def seconds_until_next_open(now=None):
+    """Whole seconds from now until the next session open"""
+    now = now or now_ist()
+    return max(int((next_market_open(now) - now).total_seconds()), 0)
+
+
+def seconds_until_next_transition(now=None):
+    """Whole seconds from now until the market next opens or closes"""
+    now = now or now_ist()
+    if not is_market_open(now):
+        return seconds_until_next_open(now)
+    close = now.replace(hour=MARKET_CLOSE.hour, minute=MARKET_CLOSE.minute, second=0, microsecond=0)
+    # Rounded up: market_status() reports OPEN up to 15:30:00 itself
+    return max(int((close - now).total_seconds()) + 1, 0)
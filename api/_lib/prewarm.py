@@ -0,0 +1,128 @@
+"""Prewarming of the hot datasets during market hours.
+
+Without it every dataset is loaded on the request path, so the first
+request after an idle gap pays the full upstream cost. A pass refreshes
+the index quotes, the market snapshot behind gainers, losers, trending
+and sectors, and the company metadata of the snapshot's symbols in the
+fundamentals store (which the snapshot only reads), either:
+
+- in process, through the same loaders and cache keys the handlers use.
+  This fills the cache of the process it runs in and the on-disk bar and
+  fundamentals stores shared with API processes on the same host; or
+- over HTTP against a deployment, which fills the cache of the warm
+  instances serving those endpoints and the edge cache in front of them.
+
+Passes only run during the 09:15-15:30 IST session; outside it cached
+data already lives until the next open.
+"""
+import json
+import os
+import time as _time
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from .fetcher import fetch_all
+from .fundamentals_store import refresh_all
+from .market_hours import is_market_open, seconds_until_next_open
+from .rolling_stats import index_quote
+from .snapshot import get_snapshot, snapshot_symbols
+from .universes import INDICES
+
+# Seconds between passes while the market is open
+PREWARM_INTERVAL = int(os.environ.get('YFINAPI_PREWARM_INTERVAL', 60))
+
+# Exchanges whose snapshot is kept warm
+PREWARM_EXCHANGES = os.environ.get('YFINAPI_PREWARM_EXCHANGES', 'nse').split(',')
+
+# Endpoints requested per exchange when warming a deployment over HTTP
+ENDPOINTS = ['/api/gainers', '/api/losers', '/api/trending', '/api/sectors']
+
+HTTP_TIMEOUT = 30
+
+
+def warm_indices():
+    """Refresh the index quotes behind /api/indices; returns the errors"""
+    _, errors = fetch_all(index_quote, INDICES.values())
+    return errors
+
+
+def warm_snapshot(exchange):
+    """Refresh the market snapshot behind the movers and sector endpoints; returns the errors"""
+    snapshot = get_snapshot(exchange)
+    # Symbols without a quote are dropped from the table and listed here
+    return dict(snapshot.attrs.get('skipped', {}))
+
+
+def warm_metadata(exchange, deadline=PREWARM_INTERVAL):
+    """Fetch the missing or stale company metadata of the snapshot's symbols; returns the errors.
+
+    A pass stops waiting after deadline seconds; the rest is picked up by
+    the next pass, and the next snapshot build reads what was stored.
+    """
+    _, errors = refresh_all(snapshot_symbols(exchange), sources=('info',), deadline=deadline)
+    return {symbol: str(error) for (symbol, _), error in errors.items()}
+
+
+def warm_url(url):
+    """GET url and read the body; returns the errors"""
+    try:
+        with urlopen(Request(url, headers={'Accept-Encoding': 'gzip'}), timeout=HTTP_TIMEOUT) as response:
+            response.read()
+    except HTTPError as e:
+        return {url: f"HTTP {e.code}"}
+    except (URLError, OSError) as e:
+        return {url: str(getattr(e, 'reason', e))}
+    return {}
+
+
+def prewarm_tasks(base_url=None, exchanges=PREWARM_EXCHANGES):
+    """[(name, task)] of one pass, in process or against the deployment at base_url"""
+    if base_url:
+        base_url = base_url.rstrip('/')
+        tasks = [('/api/indices', lambda: warm_url(f"{base_url}/api/indices"))]
+        for exchange in exchanges:
+            tasks += [(f"{path}?exchange={exchange}", lambda path=path, exchange=exchange:
+                       warm_url(f"{base_url}{path}?exchange={exchange}")) for path in ENDPOINTS]
+        return tasks
+
+    tasks = [('indices', warm_indices)]
+    tasks += [(f"snapshot:{exchange}", lambda exchange=exchange: warm_snapshot(exchange)) for exchange in exchanges]
+    tasks += [(f"metadata:{exchange}", lambda exchange=exchange: warm_metadata(exchange)) for exchange in exchanges]
+    return tasks
+
+
+def prewarm(base_url=None, exchanges=PREWARM_EXCHANGES):
+    """Run one pass; returns {name: {'seconds': ..., 'errors': {...}}}"""
+    report = {}
+    for name, task in prewarm_tasks(base_url, exchanges):
+        started = _time.perf_counter()
+        try:
+            errors = task()
+        except Exception as e:
+            errors = {name: str(e)}
+        report[name] = {'seconds': round(_time.perf_counter() - started, 2), 'errors': errors}
+    return report
+
+
+def run(interval=PREWARM_INTERVAL, once=False, force=False, base_url=None,
+        exchanges=PREWARM_EXCHANGES, log=print):
+    """Run passes every interval seconds while the market is open.
+
+    once runs at most one pass (for cron), skipping it outside the session
+    unless force is set. Otherwise this loops forever, sleeping until the
+    next open outside the session.
+    """
+    while True:
+        started = _time.monotonic()
+        if force or is_market_open():
+            report = prewarm(base_url, exchanges)
+            log(json.dumps({'prewarm': report}))
+        elif once:
+            log(json.dumps({'prewarm': "skipped, market closed"}))
+        if once:
+            return
+
+        if is_market_open():
+            _time.sleep(max(interval - (_time.monotonic() - started), 0))
+        else:
+            _time.sleep(max(seconds_until_next_open(), 1))
@@ -0,0 +1,214 @@
+"""Batched quote fetching and ranking behind the market snapshot"""
+import threading
+from urllib.parse import unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from .cache import cache, market_ttl
+from .http_session import get_session
+from .upstream import BURST, UpstreamError, call, is_transient, transient_mark, transient_since
+
+# yf.download collects per-ticker results in a module level dict, so two
+# downloads running at once in the same process would clobber each other.
+_download_lock = threading.Lock()
+
+QUOTE_COLUMNS = [
+    'date', 'current_price', 'previous_close', 'change', 'change_percent',
+    'volume', 'high', 'low'
+]
+
+
+def download_history(symbols, period="2d", interval="1d"):
+    """Download OHLCV bars for every symbol in a single multi-ticker pull.
+
+    Returns one wide DataFrame with (field, symbol) columns, so
+    frame['Close']['TCS.NS'] is the close series of a single stock.
+    frame.attrs['errors'] maps the symbols Yahoo failed on to the reason.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return pd.DataFrame()
+
+    def download(batch):
+        import yfinance as yf
+        mark = transient_mark()
+        frame = yf.download(batch, period=period, interval=interval,
+                            group_by='column', auto_adjust=True,
+                            threads=True, progress=False, session=get_session())
+        # Per-ticker failures are only logged, as "symbol may be delisted"
+        # even when Yahoo throttled the request; a batch where every
+        # ticker failed because of throttling is raised so it gets retried
+        throttled = {unquote(urlsplit(error.response.url).path.rsplit('/', 1)[-1]): error
+                     for error in transient_since(mark)}
+        errors = {symbol: str(throttled[symbol]) if symbol in throttled else reason
+                  for symbol, reason in getattr(yf.shared, '_ERRORS', {}).items()}
+        if frame.empty and throttled:
+            raise next(iter(throttled.values()))
+
+        # A single ticker comes back with flat columns, and failed tickers
+        # leave the dates as an object index
+        if not isinstance(frame.columns, pd.MultiIndex):
+            frame.columns = pd.MultiIndex.from_product([frame.columns, batch])
+        if not frame.empty and not isinstance(frame.index, pd.DatetimeIndex):
+            frame.index = pd.to_datetime(frame.index)
+        frame.attrs['errors'] = errors
+        return frame
+
+    def load():
+        # yfinance makes one request per symbol, and a batch costing more
+        # than the burst would never get rate limit capacity
+        frames, errors, failure = [], {}, None
+        for start in range(0, len(symbols), BURST):
+            batch = symbols[start:start + BURST]
+            try:
+                with _download_lock:
+                    frame = call(download, batch, cost=len(batch))
+            except Exception as e:
+                if not (isinstance(e, UpstreamError) or is_transient(e)):
+                    raise
+                failure = e
+                errors.update((symbol, str(e)) for symbol in batch)
+                continue
+            errors.update(frame.attrs['errors'])
+            frames.append(frame)
+        if not frames:
+            raise failure
+
+        frames = [frame for frame in frames if not frame.empty] or frames[:1]
+        frame = pd.concat(frames, axis=1).sort_index(axis=1) if len(frames) > 1 else frames[0]
+        frame.attrs['errors'] = errors
+        return frame
+
+    # Column order does not matter, so differently ordered lists share an entry
+    key = (tuple(sorted(symbols)), 'download', period, interval)
+    return cache.get_or_load(key, load, market_ttl('download'))
+
+
+def _nth_last_valid(values, mask, n):
+    """Row position of the n-th last valid value in every column (n=1 is the last)"""
+    counts = mask.sum(axis=0)
+    hits = mask & (mask.cumsum(axis=0) == (counts - n + 1))
+    return hits.argmax(axis=0), counts >= n
+
+
+def quote_table(frame, require_previous=True):
+    """Reduce a wide OHLCV frame to one row per symbol.
+
+    Each symbol is compared against its own previous session, so a stock
+    that did not trade on the latest date is not compared against NaN.
+    Symbols without a previous bar are dropped unless require_previous is
+    False, in which case the previous close falls back to the latest one.
+    """
+    if frame.empty:
+        return pd.DataFrame(columns=QUOTE_COLUMNS)
+
+    close = frame['Close']
+    symbols = close.columns
+    values = close.to_numpy(dtype='float64')
+    mask = ~np.isnan(values)
+    columns = np.arange(values.shape[1])
+
+    last_pos, has_last = _nth_last_valid(values, mask, 1)
+    prev_pos, has_prev = _nth_last_valid(values, mask, 2)
+
+    def pick(field, positions):
+        return frame[field].reindex(columns=symbols).to_numpy(dtype='float64')[positions, columns]
+
+    latest_close = values[last_pos, columns]
+    previous_close = np.where(has_prev, values[prev_pos, columns], latest_close)
+
+    change = latest_close - previous_close
+    change_percent = change / previous_close * 100
+
+    quotes = pd.DataFrame({
+        'date': close.index[last_pos].strftime('%Y-%m-%d'),
+        'current_price': latest_close,
+        'previous_close': previous_close,
+        'change': change,
+        'change_percent': change_percent,
+        'volume': np.nan_to_num(pick('Volume', last_pos)).astype('int64'),
+        'high': pick('High', last_pos),
+        'low': pick('Low', last_pos)
+    }, index=symbols)
+
+    keep = has_last & has_prev if require_previous else has_last
+    return quotes[keep]
+
+
+def top_k(values, k):
+    """Positions of the k largest values, largest first.
+
+    argpartition finds the k winners in linear time and only those are
+    sorted, so ranking a 500-symbol universe costs about the same as 40.
+    """
+    k = min(k, len(values))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    winners = np.argpartition(-values, k - 1)[:k]
+    return winners[np.argsort(-values[winners], kind='stable')]
+
+
+def rank_movers(quotes, limit):
+    """(gainers, losers): the limit biggest rises and falls by change_percent.
+
+    Both come from one pass over the change vectors of the quote table.
+    """
+    change = quotes['change'].to_numpy(dtype='float64')
+    change_percent = quotes['change_percent'].to_numpy(dtype='float64')
+    up = np.flatnonzero(change > 0)
+    down = np.flatnonzero(change < 0)
+    gainers = quotes.iloc[up[top_k(change_percent[up], limit)]]
+    losers = quotes.iloc[down[top_k(-change_percent[down], limit)]]
+    return gainers, losers
+
+
+def latest_bars(frame):
+    """Last bar of every symbol in a wide OHLCV frame, as rounded columns.
+
+    change and change_percent are intraday (close vs open), matching the
+    single-symbol /api/stock/latest response. Symbols without any bar are
+    left out.
+    """
+    if frame.empty:
+        return pd.DataFrame(columns=['date', 'open', 'high', 'low', 'close', 'volume', 'change', 'change_percent'])
+
+    close = frame['Close']
+    symbols = close.columns
+    values = close.to_numpy(dtype='float64')
+    mask = ~np.isnan(values)
+    columns = np.arange(values.shape[1])
+    last_pos, has_last = _nth_last_valid(values, mask, 1)
+
+    def pick(field):
+        return frame[field].reindex(columns=symbols).to_numpy(dtype='float64')[last_pos, columns]
+
+    opens = pick('Open')
+    closes = values[last_pos, columns]
+    bars = pd.DataFrame({
+        'date': close.index[last_pos].strftime('%Y-%m-%d'),
+        'open': np.round(opens, 2),
+        'high': np.round(pick('High'), 2),
+        'low': np.round(pick('Low'), 2),
+        'close': np.round(closes, 2),
+        'volume': np.nan_to_num(pick('Volume')).astype('int64'),
+        'change': np.round(closes - opens, 2),
+        'change_percent': np.round((closes - opens) / opens * 100, 2)
+    }, index=symbols)
+    return bars[has_last]
+
+
+def display_name(symbol, info):
+    """Company name from .info, falling back to the bare ticker"""
+    return info.get('longName', info.get('shortName', symbol.replace('.NS', '').replace('.BO', '')))
+
+
+def quote_fingerprint(quotes):
+    """Bytes that change whenever any symbol's latest quote changes, for ETags"""
+    values = quotes[['current_price', 'previous_close', 'volume']].to_numpy(dtype='float64')
+    return '|'.join(quotes.index).encode() + '|'.join(quotes['date']).encode() + values.tobytes()
+
+
+def frame_fingerprint(frame):
+    """Bytes that change whenever any index label or value of frame changes, for ETags"""
+    return pd.util.hash_pandas_object(frame).to_numpy().tobytes()
@@ -0,0 +1,238 @@
+"""Record/replay transport for the Yahoo upstream.
+
+Every yfinance request goes through the pooled session (http_session),
+so both modes are transport adapters mounted on it:
+
+- Record (YFINAPI_RECORD_DIR): responses from Yahoo are passed through
+  unchanged and also saved as one JSON fixture file each, whatever the
+  call behind them (history, info, financials, ...).
+- Replay (YFINAPI_UPSTREAM_URL): requests to Yahoo hosts are sent to a
+  local stand-in server instead, which serves the recorded fixtures with
+  injected latency and errors (see scripts/upstream_standin.py).
+
+Fixtures are matched on host, path and query. period2 (always "now") is
+ignored. If no fixture matches exactly, the window (range or period1)
+is ignored too: a start/end request, like the bar store's tail and
+backfill fetches, gets the shortest recorded chart of the symbol that
+covers its start, trimmed to the requested window as Yahoo would.
+"""
+import base64
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time as _time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from requests.adapters import HTTPAdapter
+
+# Query parameters left out of every fixture key, and of the fallback key
+VOLATILE_PARAMS = ('period2', 'crumb')
+WINDOW_PARAMS = ('range', 'period1')
+
+YAHOO_DOMAIN = 'yahoo.com'
+
+NOT_FOUND = {"chart": {"result": None, "error": {"code": "Not Found", "description": "No fixture recorded"}}}
+
+
+def fixture_key(url, loose=False):
+    """'host/path?sorted query' identifying the response to url"""
+    parts = urlsplit(url)
+    skip = VOLATILE_PARAMS + (WINDOW_PARAMS if loose else ())
+    params = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                    if name not in skip)
+    return f"{parts.hostname}{parts.path}?{urlencode(params)}"
+
+
+def _window(url):
+    """(period1, period2) in seconds of a start/end request, or None"""
+    params = dict(parse_qsl(urlsplit(url).query))
+    if 'period1' not in params:
+        return None
+    return int(params['period1']), int(params.get('period2', 2 ** 62))
+
+
+def _chart_result(body):
+    try:
+        return json.loads(body)['chart']['result'][0]
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+def _covers_from(fixture):
+    """First bar of a recorded chart in seconds, or None for other responses"""
+    result = _chart_result(fixture_body(fixture))
+    timestamps = (result or {}).get('timestamp')
+    return timestamps[0] if timestamps else None
+
+
+def trim_chart(body, lo, hi):
+    """Chart response body with only the bars and events in [lo, hi) seconds"""
+    data = json.loads(body)
+    try:
+        result = data['chart']['result'][0]
+    except (KeyError, IndexError, TypeError):
+        return body
+    keep = [i for i, ts in enumerate(result.get('timestamp') or []) if lo <= ts < hi]
+    result['timestamp'] = [result['timestamp'][i] for i in keep]
+    for series in (series for group in result.get('indicators', {}).values() for series in group):
+        for name, values in series.items():
+            series[name] = [values[i] for i in keep]
+    for events in result.get('events', {}).values():
+        for key in [key for key, event in events.items() if not lo <= event.get('date', lo) < hi]:
+            del events[key]
+    return json.dumps(data).encode()
+
+
+class FixtureStore:
+    """Directory of recorded responses, one JSON file each"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._exact = {}
+        self._loose = {}
+
+    def save(self, url, status, content_type, body):
+        """Atomically write the fixture for url"""
+        key = fixture_key(url)
+        fixture = {'url': url, 'key': key, 'status': status, 'content_type': content_type}
+        try:
+            fixture['body'] = body.decode('utf-8')
+        except UnicodeDecodeError:
+            fixture['body_base64'] = base64.b64encode(body).decode('ascii')
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(fixture, f)
+        os.replace(tmp, os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest()[:20] + '.json'))
+
+    def load(self):
+        """Index every fixture in the directory by its exact and fallback key"""
+        paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.json')]
+        for path in sorted(paths, key=os.path.getmtime):
+            with open(path) as f:
+                fixture = json.load(f)
+            # Keys are recomputed, so fixtures recorded with older keys still match
+            fixture['covers_from'] = _covers_from(fixture)
+            self._exact[fixture_key(fixture['url'])] = fixture
+            self._loose.setdefault(fixture_key(fixture['url'], loose=True), []).append(fixture)
+        return self
+
+    def find(self, url):
+        """(fixture, window to trim it to) for url; the fixture is None when nothing matches"""
+        fixture = self._exact.get(fixture_key(url))
+        if fixture is not None:
+            return fixture, None
+        candidates = self._loose.get(fixture_key(url, loose=True))
+        if not candidates:
+            return None, None
+
+        # The shortest recording that reaches back to the start, else the longest
+        window = _window(url)
+        charts = [fixture for fixture in candidates if fixture['covers_from'] is not None]
+        if not charts:
+            return candidates[-1], None
+        covering = [fixture for fixture in charts if window and fixture['covers_from'] <= window[0]]
+        if covering:
+            return max(covering, key=lambda fixture: fixture['covers_from']), window
+        return min(charts, key=lambda fixture: fixture['covers_from']), window
+
+    def __len__(self):
+        return len(self._exact)
+
+
+def fixture_body(fixture):
+    if 'body_base64' in fixture:
+        return base64.b64decode(fixture['body_base64'])
+    return fixture['body'].encode('utf-8')
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Sends requests as usual and saves every Yahoo response as a fixture"""
+
+    def __init__(self, directory, **kwargs):
+        super().__init__(**kwargs)
+        self.fixtures = FixtureStore(directory)
+
+    def send(self, request, **kwargs):
+        url = request.url
+        response = super().send(request, **kwargs)
+        # Throttled and failed responses would be replayed forever
+        if response.status_code == 429 or response.status_code >= 500:
+            return response
+        if (urlsplit(url).hostname or '').endswith(YAHOO_DOMAIN):
+            # .content is kept on the response, so yfinance still reads it
+            self.fixtures.save(url, response.status_code,
+                               response.headers.get('Content-Type', 'application/json'), response.content)
+        return response
+
+
+class RedirectAdapter(HTTPAdapter):
+    """Sends requests for Yahoo hosts to the stand-in server at base_url"""
+
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url.rstrip('/')
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        if (parts.hostname or '').endswith(YAHOO_DOMAIN):
+            request.url = f"{self.base_url}/{parts.hostname}{parts.path}" + (f"?{parts.query}" if parts.query else '')
+        return super().send(request, **kwargs)
+
+
+def standin_handler(fixtures, latency=0.0, jitter=0.0, error_rate=0.0, error_status=429, seed=None):
+    """BaseHTTPRequestHandler class serving fixtures for '/<yahoo host>/<path>?<query>' requests.
+
+    Every response is delayed by latency plus up to jitter seconds, and
+    error_rate of them fail with error_status, as a throttled Yahoo would.
+    """
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+
+    class StandinHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            with rng_lock:
+                delay = latency + rng.uniform(0, jitter)
+                failing = rng.random() < error_rate
+            _time.sleep(delay)
+
+            if failing:
+                self.respond(error_status, 'text/plain', b'Too Many Requests' if error_status == 429 else b'Error')
+                return
+            fixture, window = fixtures.find('https:/' + self.path)
+            if fixture is None:
+                self.respond(404, 'application/json', json.dumps(NOT_FOUND).encode())
+                return
+            body = fixture_body(fixture)
+            if window is not None:
+                body = trim_chart(body, *window)
+            self.respond(fixture['status'], fixture['content_type'], body)
+
+        def respond(self, status, content_type, body):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StandinHandler
+
+
+def make_standin(directory, host='127.0.0.1', port=8765, **options):
+    """ThreadingHTTPServer replaying the fixtures in directory; options as for standin_handler()"""
+    fixtures = FixtureStore(directory).load()
+    server = ThreadingHTTPServer((host, port), standin_handler(fixtures, **options))
+    server.daemon_threads = True
+    server.fixtures = fixtures
+    return server
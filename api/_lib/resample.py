@@ -0,0 +1,74 @@
+"""Vectorized OHLCV resampling of intraday bars.
+
+Coarser intraday intervals are derived locally from the finest bars
+instead of being downloaded separately. Bins start at the 09:15 IST
+session open, as Yahoo's own NSE/BSE intraday bars do, so 1h bars run
+09:15-10:15 and so on; the last bin of a session (or of a session still
+in progress) is a partial bar covering only the bars that exist.
+"""
+import numpy as np
+import pandas as pd
+
+from .market_hours import MARKET_OPEN
+
+# Minutes per derivable interval
+INTERVAL_MINUTES = {
+    '1m': 1,
+    '2m': 2,
+    '5m': 5,
+    '15m': 15,
+    '30m': 30,
+    '60m': 60,
+    '90m': 90,
+    '1h': 60,
+}
+
+# Bins are anchored to the session open of these exchange timezones only
+SESSION_TIMEZONES = ('Asia/Kolkata',)
+
+_MINUTE = 60 * 10**9
+_DAY = 24 * 60 * _MINUTE
+_OPEN = (MARKET_OPEN.hour * 60 + MARKET_OPEN.minute) * _MINUTE
+
+
+def can_resample(history, source, interval):
+    """Whether interval can be built from bars of the source interval in history"""
+    if interval not in INTERVAL_MINUTES or source not in INTERVAL_MINUTES:
+        return False
+    return (INTERVAL_MINUTES[interval] % INTERVAL_MINUTES[source] == 0
+            and str(history.index.tz) in SESSION_TIMEZONES)
+
+
+def resample(history, interval):
+    """history (a Ticker.history()-shaped intraday frame) aggregated to interval.
+
+    Open is the first bar's open, close the last bar's close, high/low
+    the extremes and volume the sum of every source bar in a bin. Each
+    bin is labelled with its start time, like Yahoo's bars.
+    """
+    # Yahoo pads quiet minutes with all-NaN rows
+    history = history[history['Close'].notna()][['Open', 'High', 'Low', 'Close', 'Volume']]
+    if history.empty:
+        return history
+
+    index = history.index
+    utc = index.asi8
+    local = index.tz_localize(None).asi8
+
+    # Bin start in local time: whole multiples of the interval after the day's open
+    width = INTERVAL_MINUTES[interval] * _MINUTE
+    day = local - local % _DAY
+    bins = day + _OPEN + (local - day - _OPEN) // width * width
+
+    starts = np.flatnonzero(np.append(True, bins[1:] != bins[:-1]))
+    ends = np.append(starts[1:], len(bins)) - 1
+    # UTC offset of each bin from its first bar, so DST-observing zones stay correct
+    labels = bins[starts] - (local[starts] - utc[starts])
+
+    return pd.DataFrame({
+        'Open': history['Open'].to_numpy(dtype='float64')[starts],
+        'High': np.maximum.reduceat(history['High'].to_numpy(dtype='float64'), starts),
+        'Low': np.minimum.reduceat(history['Low'].to_numpy(dtype='float64'), starts),
+        'Close': history['Close'].to_numpy(dtype='float64')[ends],
+        'Volume': np.add.reduceat(history['Volume'].fillna(0).to_numpy(dtype='int64'), starts),
+    }, index=pd.DatetimeIndex(labels, tz='UTC').tz_convert(index.tz))
@@ -0,0 +1,212 @@
+"""Response encoding shared by the handlers.
+
+Responses are compact JSON unless the client asks for pretty=1, encoded
+with orjson when it is installed and compressed with brotli or gzip
+when the client accepts it and the body is large enough to benefit.
+"""
+import gzip
+import hashlib
+import json
+import os
+import time as _time
+from itertools import islice
+from urllib.parse import parse_qs, urlparse
+
+from .cache import market_ttl
+
+try:
+    import orjson
+except ImportError:  # Optional speedup
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Optional speedup
+    brotli = None
+
+# Seconds the edge may serve an expired response while it revalidates
+EDGE_STALE_WHILE_REVALIDATE = 30
+
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_SIZE = int(os.environ.get('YFINAPI_COMPRESS_MIN_SIZE', 1024))
+
+# Records written per chunk when streaming
+STREAM_BATCH = 2000
+
+# For responses that only change on deploy (docs, symbol search)
+STATIC_CACHE_CONTROL = 'public, max-age=3600, s-maxage=86400'
+
+
+def encode_json(data, pretty=False):
+    """Serialize data to UTF-8 JSON bytes, compact unless pretty"""
+    if orjson is not None:
+        try:
+            option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            if pretty:
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(data, option=option)
+        except TypeError:
+            pass  # Types orjson refuses fall back to the stdlib encoder
+
+    if pretty:
+        return json.dumps(data, indent=2, default=str).encode()
+    return json.dumps(data, separators=(',', ':'), default=str).encode()
+
+
+def _accepted_encodings(handler):
+    header = handler.headers.get('Accept-Encoding', '') if handler.headers else ''
+    accepted = set()
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0'):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def _compress(handler, body):
+    """Return (body, content_encoding) negotiated from Accept-Encoding"""
+    if len(body) < COMPRESS_MIN_SIZE:
+        return body, None
+
+    accepted = _accepted_encodings(handler)
+    if brotli is not None and 'br' in accepted:
+        return brotli.compress(body, quality=4), 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return gzip.compress(body, compresslevel=5), 'gzip'
+    return body, None
+
+
+def wants_pretty(handler):
+    """True when the request has pretty=1"""
+    query_params = parse_qs(urlparse(handler.path).query)
+    return query_params.get('pretty', ['0'])[0].lower() in ('1', 'true', 'yes')
+
+
+def market_cache_control(ttl=None):
+    """Cache-Control for market data, following the IST session.
+
+    Browsers always revalidate (max-age=0) and get cheap 304s through the
+    ETag, while the Vercel edge keeps the response for ttl seconds: by
+    default a few seconds when the market is open and until the next
+    09:15 IST open when it is not. The edge may serve it stale while it
+    revalidates for at most EDGE_STALE_WHILE_REVALIDATE seconds, and no
+    longer than ttl.
+    """
+    if ttl is None:
+        ttl = market_ttl('edge')
+    return f'public, max-age=0, s-maxage={ttl}, stale-while-revalidate={min(ttl, EDGE_STALE_WHILE_REVALIDATE)}'
+
+
+def make_etag(handler, *parts):
+    """Weak ETag over the request path and the data the response is built from.
+
+    parts should be cheap to produce, e.g. the latest bar timestamp and
+    close, or the raw bytes of a quote column, so the ETag can be checked
+    before the response body is assembled.
+    """
+    digest = hashlib.blake2b(handler.path.encode(), digest_size=12)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else repr(part).encode())
+    return f'W/"{digest.hexdigest()}"'
+
+
+def send_not_modified(handler, etag, cache_control=None):
+    """Answer a matching If-None-Match with 304 and return True, else return False"""
+    if_none_match = handler.headers.get('If-None-Match', '') if handler.headers else ''
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    # Weak comparison: W/"x" matches "x"
+    bare = etag[2:] if etag.startswith('W/') else etag
+    if '*' not in candidates and not any(c in (etag, bare, 'W/' + bare) for c in candidates):
+        return False
+
+    handler.send_response(304)
+    handler.send_header('ETag', etag)
+    handler.send_header('Cache-Control', cache_control or market_cache_control())
+    handler.send_header('Access-Control-Allow-Origin', '*')
+    handler.send_header('Vary', 'Accept-Encoding')
+    handler.end_headers()
+    return True
+
+
+def send_json(handler, data, status=200, etag=None, cache_control=None):
+    """Encode, compress and write a JSON response.
+
+    Successful responses carry the given ETag and a Cache-Control header
+    (market-hours based unless one is passed); errors are never cached.
+    Server-Timing reports the encode and compress time, and
+    X-Uncompressed-Length the size of the JSON before compression.
+    """
+    started = _time.perf_counter()
+    body = encode_json(data, pretty=wants_pretty(handler))
+    encoded = _time.perf_counter()
+    raw_size = len(body)
+    body, content_encoding = _compress(handler, body)
+    compressed = _time.perf_counter()
+
+    handler.send_response(status)
+    handler.send_header('Content-type', 'application/json')
+    handler.send_header('Access-Control-Allow-Origin', '*')
+    handler.send_header('Vary', 'Accept-Encoding')
+    if status == 200:
+        if etag:
+            handler.send_header('ETag', etag)
+        handler.send_header('Cache-Control', cache_control or market_cache_control())
+    else:
+        handler.send_header('Cache-Control', 'no-store')
+    if content_encoding:
+        handler.send_header('Content-Encoding', content_encoding)
+    handler.send_header('Content-Length', str(len(body)))
+    handler.send_header('X-Uncompressed-Length', str(raw_size))
+    handler.send_header('Server-Timing', 'encode;dur=%.2f, compress;dur=%.2f' % (
+        (encoded - started) * 1000, (compressed - encoded) * 1000))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+
+def _write_chunk(handler, data, chunked):
+    if not data:
+        return
+    if chunked:
+        handler.wfile.write(b'%X\r\n' % len(data) + data + b'\r\n')
+    else:
+        handler.wfile.write(data)
+
+
+def send_ndjson(handler, records, batch_size=STREAM_BATCH, etag=None):
+    """Stream an iterable of dicts as newline-delimited JSON.
+
+    Records are pulled from the iterable batch by batch, so the full
+    response never has to exist in memory. HTTP/1.1 clients get chunked
+    transfer encoding; HTTP/1.0 clients get a body delimited by the
+    connection close. An error raised by the iterable after the headers
+    have gone out is reported as a final {"error": ...} record.
+    """
+    chunked = handler.request_version == 'HTTP/1.1'
+    if chunked:
+        handler.protocol_version = 'HTTP/1.1'
+
+    handler.send_response(200)
+    handler.send_header('Content-type', 'application/x-ndjson')
+    handler.send_header('Access-Control-Allow-Origin', '*')
+    if etag:
+        handler.send_header('ETag', etag)
+    handler.send_header('Cache-Control', market_cache_control())
+    if chunked:
+        handler.send_header('Transfer-Encoding', 'chunked')
+    handler.send_header('Connection', 'close')
+    handler.end_headers()
+    handler.close_connection = True
+
+    records = iter(records)
+    try:
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            _write_chunk(handler, b''.join(encode_json(record) + b'\n' for record in batch), chunked)
+    except Exception as e:
+        _write_chunk(handler, encode_json({"error": str(e)}) + b'\n', chunked)
+
+    if chunked:
+        handler.wfile.write(b'0\r\n\r\n')
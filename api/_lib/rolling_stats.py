@@ -0,0 +1,107 @@
+"""Rolling daily statistics: previous close, 52-week range and moving averages.
+
+Everything except the current session's bar is fixed once a session
+has started, so the aggregates over completed sessions are computed
+once per symbol and session from the on-disk daily bar store (which
+only downloads its missing tail) and cached. A request then combines
+them with the live bar from a 1-day fetch instead of pulling a year of
+history.
+"""
+import numpy as np
+import pandas as pd
+
+from .bar_store import load_history
+from .cache import cache
+from .market_data import get_history
+
+# Trading sessions per moving average
+MOVING_AVERAGES = (50, 200)
+
+# Reference points for period_change_percent; '5d' counts sessions, the rest calendar time
+PERIODS = {
+    '1d': 1,
+    '5d': 5,
+    '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3),
+    '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1),
+}
+
+# Daily history kept in the bar store; enough for the 200-day average and a year back
+STORED_PERIOD = '2y'
+
+# Aggregates are keyed by session date, so this only bounds memory for idle symbols
+AGGREGATES_TTL = 24 * 60 * 60
+
+
+def _aggregates(symbol, session_date):
+    """Aggregates over the completed sessions before session_date (a datetime.date)"""
+    history = load_history(symbol, period=STORED_PERIOD, interval='1d')
+    if history.empty:
+        return {}
+    dates = np.asarray(history.index.date)
+    completed = history[dates < session_date]
+    if completed.empty:
+        return {}
+
+    closes = completed['Close'].to_numpy(dtype='float64')
+    session = pd.Timestamp(session_date)
+    in_year = np.asarray(completed.index.date) >= (session - pd.DateOffset(weeks=52)).date()
+
+    period_closes = {}
+    for period, offset in PERIODS.items():
+        if isinstance(offset, int):
+            period_closes[period] = float(closes[-offset]) if len(closes) >= offset else None
+        else:
+            before = np.asarray(completed.index.date) <= (session - offset).date()
+            period_closes[period] = float(closes[before][-1]) if before.any() else None
+
+    return {
+        'as_of': completed.index[-1].strftime('%Y-%m-%d'),
+        'previous_close': float(closes[-1]),
+        'year_high': float(completed['High'].to_numpy(dtype='float64')[in_year].max()) if in_year.any() else None,
+        'year_low': float(completed['Low'].to_numpy(dtype='float64')[in_year].min()) if in_year.any() else None,
+        # Sum and count of the last n - 1 completed closes; the live close makes n
+        'close_sums': {n: (float(closes[-(n - 1):].sum()), min(len(closes), n - 1)) for n in MOVING_AVERAGES},
+        'period_closes': period_closes,
+    }
+
+
+def get_aggregates(symbol, session_date):
+    """Cached aggregates over the completed sessions before session_date"""
+    key = (symbol, 'rolling', session_date.isoformat(), '1d')
+    return cache.get_or_load(key, lambda: _aggregates(symbol, session_date), AGGREGATES_TTL)
+
+
+def rolling_stats(symbol, latest, period='1d'):
+    """Rolling statistics as of latest, the current session's daily bar.
+
+    Values that need more history than is available are None.
+    """
+    aggregates = get_aggregates(symbol, latest.name.date())
+    close = float(latest['Close'])
+    stats = {
+        'previous_close': aggregates.get('previous_close'),
+        '52_week_high': max(float(latest['High']), aggregates.get('year_high') or -np.inf),
+        '52_week_low': min(float(latest['Low']), aggregates.get('year_low') or np.inf),
+        'as_of': aggregates.get('as_of'),
+    }
+    for n in MOVING_AVERAGES:
+        total, count = aggregates.get('close_sums', {}).get(n, (0.0, 0))
+        stats[f'{n}_day_average'] = (total + close) / n if count == n - 1 else None
+
+    base = aggregates.get('period_closes', {}).get(period)
+    stats['period_change_percent'] = (close - base) / base * 100 if base else None
+    return stats
+
+
+def index_quote(symbol, period='1d'):
+    """(current session's bar, rolling_stats) of an index, as /api/indices shows it.
+
+    Only the current session's bar is fetched; previous close, the 52-week
+    range and moving averages come from the cached aggregates.
+    """
+    history = get_history(symbol, period='1d')
+    if history.empty:
+        return history, None
+    return history, rolling_stats(symbol, history.iloc[-1], period)
@@ -0,0 +1,80 @@
+"""Sector analytics as one groupby over the market snapshot.
+
+A symbol -> sector mapping (the curated lists, or Yahoo's sector of
+every stock in a universe) is joined to the snapshot and aggregated in
+a single pass: breadth, equal- and market-cap-weighted change, turnover,
+and each sector's best and worst constituents.
+"""
+import numpy as np
+import pandas as pd
+
+from .universes import sector_constituents, universe_symbols
+
+SECTOR_COLUMNS = [
+    'total_stocks', 'total_gainers', 'total_losers', 'unchanged', 'average_change',
+    'market_cap_weighted_change', 'breadth', 'turnover', 'market_cap'
+]
+
+
+def sector_members(snapshot, exchange, universe=None):
+    """Symbol -> sector Series: the curated lists, or Yahoo sectors over a universe"""
+    if universe is None:
+        pairs = [(symbol, sector) for sector, symbols in sector_constituents(exchange).items() for symbol in symbols]
+        return pd.Series([sector for _, sector in pairs], index=[symbol for symbol, _ in pairs], dtype=object)
+
+    symbols = universe_symbols(universe, exchange)
+    sectors = snapshot['sector'].reindex(symbols)
+    return sectors[sectors.notna() & (sectors != '')]
+
+
+def sector_table(snapshot, members):
+    """One row per sector with the SECTOR_COLUMNS, sorted by average change.
+
+    total_stocks counts every mapped symbol; the rest only those with a
+    quote. market_cap_weighted_change is the change in the sector's total
+    market cap since the previous close, which is what a cap-weighted
+    sector index would show.
+    """
+    total = members.groupby(members.values, sort=False).size()
+    quotes = snapshot.reindex(members.index)
+    quoted = quotes['current_price'].notna().to_numpy()
+    quotes = quotes[quoted].assign(sector=members.values[quoted])
+
+    change = quotes['change'].to_numpy(dtype='float64')
+    market_cap = np.nan_to_num(quotes['market_cap'].to_numpy(dtype='float64'))
+    previous_cap = market_cap * quotes['previous_close'].to_numpy(dtype='float64') / quotes['current_price'].to_numpy(dtype='float64')
+    frame = pd.DataFrame({
+        'sector': quotes['sector'].to_numpy(),
+        'gainer': change > 0,
+        'loser': change < 0,
+        'unchanged': change == 0,
+        'change_percent': quotes['change_percent'].to_numpy(dtype='float64'),
+        'turnover': np.nan_to_num(quotes['turnover'].to_numpy(dtype='float64')),
+        'market_cap': market_cap,
+        'previous_cap': np.nan_to_num(previous_cap),
+    })
+
+    sums = frame.groupby('sector', sort=False).agg(
+        total_gainers=('gainer', 'sum'), total_losers=('loser', 'sum'), unchanged=('unchanged', 'sum'),
+        average_change=('change_percent', 'mean'), turnover=('turnover', 'sum'),
+        market_cap=('market_cap', 'sum'), previous_cap=('previous_cap', 'sum'),
+    )
+    table = sums.reindex(total.index)
+    counts = table[['total_gainers', 'total_losers', 'unchanged']].fillna(0).astype('int64')
+    table[['total_gainers', 'total_losers', 'unchanged']] = counts
+    table['total_stocks'] = total
+    table['market_cap_weighted_change'] = np.where(
+        table['previous_cap'] > 0, (table['market_cap'] - table['previous_cap']) / table['previous_cap'] * 100, np.nan)
+    # Net advancers as a share of the quoted constituents, from -1 to 1
+    quoted_count = counts.sum(axis=1).replace(0, np.nan)
+    table['breadth'] = (counts['total_gainers'] - counts['total_losers']) / quoted_count
+    table[['turnover', 'market_cap']] = table[['turnover', 'market_cap']].fillna(0)
+    table['average_change'] = table['average_change'].fillna(0)
+    return table[SECTOR_COLUMNS].sort_values('average_change', ascending=False, kind='stable')
+
+
+def ranked_constituents(snapshot, members):
+    """The snapshot rows of every mapped symbol with a quote, by sector and then change_percent, best first"""
+    quotes = snapshot.reindex(members.index).assign(sector=members.values)
+    quotes = quotes[quotes['current_price'].notna()]
+    return quotes.sort_values(['sector', 'change_percent'], ascending=[True, False], kind='stable')
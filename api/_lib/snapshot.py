@@ -0,0 +1,156 @@
+"""Market snapshot shared by the gainers, losers, trending and sectors endpoints.
+
+One columnar table per exchange holds the latest quote of every symbol
+in the snapshot universe (plus the sector lists) next to its name,
+sector and market cap. Prices come from one bulk download, rebuilt at
+the 'snapshot' cadence. Company metadata is only read from the
+fundamentals store, never fetched for the whole table on the request
+path: symbols the store lacks get their bare ticker as name, and are
+fetched for the rows a response returns (with_metadata) or off the
+request path by prewarm (warm_metadata) and
+scripts/refresh_fundamentals.py.
+Endpoints are filtered and sorted views over the cached table, so a
+request only pays for the upstream calls when the snapshot is due.
+Symbols without a quote are listed with the reason in
+table.attrs['skipped'], so responses can report them.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from .cache import cache, market_ttl
+from .fetcher import fetch_all
+from .fundamentals_store import load_fundamentals, read_stored
+from .quotes import display_name, download_history, quote_table
+from .universes import SUFFIXES, sector_constituents, universe_symbols
+
+# Universe every snapshot covers; narrower universes are views over it
+SNAPSHOT_UNIVERSE = os.environ.get('YFINAPI_SNAPSHOT_UNIVERSE', 'nifty500')
+
+METADATA_COLUMNS = ['name', 'sector', 'industry', 'shares_outstanding', 'info_market_cap']
+
+
+def snapshot_symbols(exchange, universe=SNAPSHOT_UNIVERSE):
+    """Symbols a snapshot covers; the default one also covers every sector list"""
+    symbols = list(universe_symbols(universe, exchange))
+    if universe == SNAPSHOT_UNIVERSE:
+        for stocks in sector_constituents(exchange).values():
+            symbols += stocks
+    return list(dict.fromkeys(symbols))
+
+
+def _metadata_row(symbol, info):
+    return {
+        'name': display_name(symbol, info),
+        'sector': info.get('sector', ''),
+        'industry': info.get('industry', ''),
+        'shares_outstanding': info.get('sharesOutstanding') or np.nan,
+        'info_market_cap': info.get('marketCap') or np.nan,
+    }
+
+
+def _metadata(symbols, infos):
+    """Metadata frame indexed by symbol; symbols missing from infos get the fallbacks"""
+    rows = [_metadata_row(symbol, infos.get(symbol) or {}) for symbol in symbols]
+    return pd.DataFrame(rows, index=pd.Index(symbols), columns=METADATA_COLUMNS)
+
+
+def _market_cap(table):
+    """Live market cap from the share count where known, else Yahoo's last figure"""
+    shares = table['shares_outstanding'].to_numpy(dtype='float64')
+    return np.where(shares > 0, shares * table['current_price'].to_numpy(dtype='float64'),
+                    table['info_market_cap'].to_numpy(dtype='float64'))
+
+
+def build_snapshot(exchange, universe=SNAPSHOT_UNIVERSE):
+    """Latest quote, name, sector and market cap of every symbol, one row each.
+
+    Only prices are fetched; the metadata is whatever the fundamentals
+    store has, and the 'metadata' column tells which rows had any.
+    """
+    symbols = snapshot_symbols(exchange, universe)
+    frame = download_history(symbols, period="5d")
+    quotes = quote_table(frame, require_previous=False)
+    infos = read_stored(quotes.index, 'info')
+
+    table = quotes.join(_metadata(quotes.index, infos), how='left')
+    table['metadata'] = table.index.isin(list(infos))
+    table['market_cap'] = _market_cap(table)
+    table['turnover'] = table['current_price'] * table['volume']
+    table = table.drop(columns=['shares_outstanding', 'info_market_cap'])
+
+    errors = frame.attrs.get('errors', {})
+    table.attrs['skipped'] = {symbol: errors.get(symbol, "no price in the last 5 sessions")
+                              for symbol in symbols if symbol not in quotes.index}
+    return table
+
+
+def with_metadata(rows):
+    """rows of a snapshot view, with the metadata the store lacked fetched for them.
+
+    Meant for the few rows a response returns. Symbols not loaded within
+    the fetch_all deadline keep their fallbacks; the calls left running
+    in the background fill the store for the next snapshot.
+    """
+    missing = list(rows.index[~rows['metadata']])
+    if not missing:
+        return rows
+    infos, _ = fetch_all(lambda symbol: load_fundamentals(symbol, 'info'), missing)
+    if not infos:
+        return rows
+
+    fetched = list(infos)
+    update = _metadata(fetched, infos).assign(current_price=rows.loc[fetched, 'current_price'])
+    rows = rows.copy()
+    rows.loc[fetched, ['name', 'sector', 'industry']] = update[['name', 'sector', 'industry']]
+    rows.loc[fetched, 'market_cap'] = _market_cap(update)
+    rows.loc[fetched, 'metadata'] = True
+    return rows
+
+
+def get_snapshot(exchange='nse', universe=None):
+    """The cached snapshot table, restricted to a universe when one is given.
+
+    Universes inside the snapshot universe are row filters over the shared
+    table; wider ones ('all') get a snapshot of their own.
+    """
+    exchange = exchange if exchange in SUFFIXES else 'nse'
+    symbols = universe_symbols(universe, exchange) if universe else None
+    base = SNAPSHOT_UNIVERSE
+    if symbols is not None and not set(symbols) <= set(snapshot_symbols(exchange)):
+        base = universe
+
+    key = (exchange, 'snapshot', base, None)
+    table = cache.get_or_load(key, lambda: build_snapshot(exchange, base), market_ttl('snapshot'))
+    if symbols is None:
+        return table
+    view = table[table.index.isin(symbols)]
+    wanted = set(symbols)
+    view.attrs['skipped'] = {symbol: reason for symbol, reason in table.attrs.get('skipped', {}).items()
+                             if symbol in wanted}
+    return view
+
+
+def skipped_records(table, symbols=None):
+    """[{symbol, reason}] for the symbols a snapshot view has no quote for, optionally only those in symbols"""
+    skipped = table.attrs.get('skipped', {})
+    if symbols is not None:
+        symbols = set(symbols)
+        skipped = {symbol: reason for symbol, reason in skipped.items() if symbol in symbols}
+    return [{"symbol": symbol, "reason": reason} for symbol, reason in sorted(skipped.items())]
+
+
+def snapshot_records(table, fields, exchange):
+    """Per-stock dicts for a snapshot view: symbol, name, fields, market cap, sector and exchange"""
+    records = []
+    for symbol, name, row, market_cap, sector in zip(
+            table.index, table['name'], table[fields].round(2).to_dict('records'),
+            table['market_cap'], table['sector']):
+        record = {"symbol": symbol, "name": name}
+        record.update(row)
+        record["market_cap"] = int(market_cap) if market_cap == market_cap else 0
+        record["sector"] = sector
+        record["exchange"] = exchange.upper()
+        records.append(record)
+    return records
@@ -0,0 +1,240 @@
+"""NSE/BSE symbol master with indexed, typo-tolerant search.
+
+The listings in api/_data/symbols.csv are loaded once per process into
+a prefix trie over symbols and name words, for autocomplete, and a
+trigram inverted index over the same keys, for misspelled queries. A
+search touches only the postings of the query's prefixes and trigrams,
+never the whole universe, and makes no upstream calls.
+"""
+import csv
+import hashlib
+import heapq
+import os
+import re
+import threading
+from collections import Counter
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '_data', 'symbols.csv')
+
+# Trigram overlap (Dice coefficient) a fuzzy match needs to be considered
+MIN_SIMILARITY = 0.3
+
+# Closest keys by trigram overlap that are re-ranked by edit distance, per token
+FUZZY_CANDIDATES = 16
+
+_WORD = re.compile(r'[A-Z0-9&]+')
+
+# Words that say nothing about which company is meant
+_STOPWORDS = {'LTD', 'LIMITED', 'OF', 'AND', '&', 'THE', 'CO', 'INDIA'}
+
+
+def _words(text):
+    return _WORD.findall(text.upper())
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a, b, limit):
+    """Damerau-Levenshtein distance (adjacent swaps count once), or limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+    return current[-1]
+
+
+class SymbolMaster:
+    """In-memory listings with a prefix trie and a trigram index over their keys"""
+
+    def __init__(self, rows):
+        self.listings = []
+        self.names = []  # listing id -> (base symbol, name words)
+        self.trie = {}  # char -> child node; node[None] = ids of listings with a key through it
+        self.key_ids = {}  # key -> key id
+        self.key_names = []  # key id -> key
+        self.key_listings = []  # key id -> ids of listings with that key
+        self.key_grams = []  # key id -> number of trigrams in the key
+        self.grams = {}  # trigram -> key ids
+
+        for row in rows:
+            self._add(row)
+
+        # listing id -> position when sorted NSE first, then by symbol
+        by_symbol = sorted(range(len(self.listings)),
+                           key=lambda i: (self.listings[i]['exchange'] != 'NSE', self.listings[i]['symbol']))
+        self.order = [0] * len(by_symbol)
+        for position, listing_id in enumerate(by_symbol):
+            self.order[listing_id] = position
+
+    def _add(self, row):
+        listing_id = len(self.listings)
+        symbol = row['symbol'].strip().upper()
+        listing = {
+            'symbol': symbol,
+            'name': row.get('name', '').strip(),
+            'isin': row.get('isin', '').strip(),
+            'series': row.get('series', '').strip(),
+            'exchange': row.get('exchange', '').strip().upper(),
+        }
+        base = symbol.rsplit('.', 1)[0]
+        words = [word for word in _words(listing['name']) if word not in _STOPWORDS]
+
+        self.listings.append(listing)
+        self.names.append((base, words))
+
+        for key in dict.fromkeys([base] + words + [''.join(words)]):
+            node = self.trie
+            for char in key:
+                node = node.setdefault(char, {})
+                node.setdefault(None, set()).add(listing_id)
+
+            key_id = self.key_ids.get(key)
+            if key_id is None:
+                key_id = self.key_ids[key] = len(self.key_names)
+                grams = _trigrams(key)
+                self.key_names.append(key)
+                self.key_listings.append(set())
+                self.key_grams.append(len(grams))
+                for gram in grams:
+                    self.grams.setdefault(gram, []).append(key_id)
+            self.key_listings[key_id].add(listing_id)
+
+    def _prefixed(self, prefix):
+        """Ids of listings with a key starting with prefix"""
+        node = self.trie
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return set()
+        return node.get(None, set())
+
+    def _fuzzy(self, token):
+        """{listing id: match quality in (0, 1]} for keys close to a misspelled token"""
+        if len(token) < 3:
+            return {}
+        max_typos = 1 if len(token) < 7 else 2
+        query_grams = _trigrams(token)
+        counts = Counter()
+        for gram in query_grams:
+            counts.update(self.grams.get(gram, ()))
+
+        similarities = {key_id: 2 * shared / (len(query_grams) + self.key_grams[key_id])
+                        for key_id, shared in counts.items()}
+        closest = heapq.nlargest(FUZZY_CANDIDATES, similarities, key=similarities.get)
+
+        matches = {}
+        for key_id in closest:
+            similarity = similarities[key_id]
+            key = self.key_names[key_id]
+            # Compare against the start of longer keys, so partial input with a
+            # typo ("relainc", "bnk") still matches, allowing for one dropped letter
+            distance = min(_edit_distance(token, key[:len(token) + extra], max_typos) for extra in (0, 1))
+            if distance > max_typos and similarity < MIN_SIMILARITY:
+                continue
+            quality = max(similarity, 1 - distance / (max_typos + 1))
+            for listing_id in self.key_listings[key_id]:
+                matches[listing_id] = max(matches.get(listing_id, 0), quality)
+        return matches
+
+    def search(self, query, exchange='both', limit=50):
+        """Ranked listings for a symbol or company name query, partial or misspelled"""
+        query_upper = re.sub(r'\.(NS|BO)$', '', query.strip().upper())
+        tokens = [token for token in _words(query_upper) if token not in _STOPWORDS] or _words(query_upper)
+        if not tokens:
+            return []
+        joined = ''.join(tokens)
+
+        # Each token must prefix some key (autocomplete); a token that prefixes
+        # nothing is looked up as a misspelling in the trigram index instead
+        candidates = None
+        fuzzy_quality = {}
+        prefix_tokens = 0
+        for token in tokens:
+            ids = self._prefixed(token)
+            if ids:
+                prefix_tokens += 1
+            else:
+                matches = self._fuzzy(token)
+                ids = set(matches)
+                for listing_id, quality in matches.items():
+                    fuzzy_quality[listing_id] = fuzzy_quality.get(listing_id, 0) + quality
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return []
+
+        if exchange != 'both':
+            candidates = [i for i in candidates if self.listings[i]['exchange'] == exchange.upper()]
+
+        scores = {}
+        for listing_id in candidates:
+            base, words = self.names[listing_id]
+            if listing_id in fuzzy_quality:
+                score = int(20 + 40 * (prefix_tokens + fuzzy_quality[listing_id]) / len(tokens))
+            elif base == joined:
+                score = 100
+            elif base.startswith(joined):
+                score = 90 - min(len(base) - len(joined), 10)
+            elif words and words[0].startswith(tokens[0]):
+                score = 80
+            else:
+                score = 70
+            scores[listing_id] = score
+
+        # Ties go to NSE, then alphabetically; short prefixes match thousands
+        # of listings, so only the head of the ranking is ordered
+        rank = lambda listing_id: (-scores[listing_id], self.order[listing_id])
+        ranked = heapq.nsmallest(2 * limit, scores, key=rank)
+        results = self._collect(ranked, scores, exchange, limit)
+        if len(results) < limit < len(scores):
+            results = self._collect(sorted(scores, key=rank), scores, exchange, limit)
+        return results
+
+    def _collect(self, ranked, scores, exchange, limit):
+        results = []
+        seen_isins = set()
+        for listing_id in ranked:
+            listing = self.listings[listing_id]
+            # One row per company when both exchanges are searched, preferring NSE
+            if exchange == 'both' and listing['isin']:
+                if listing['isin'] in seen_isins:
+                    continue
+                seen_isins.add(listing['isin'])
+            results.append(dict(listing, relevance_score=scores[listing_id]))
+            if len(results) >= limit:
+                break
+        return results
+
+
+_master = None
+_master_version = None
+_master_lock = threading.Lock()
+
+
+def get_master():
+    """The process-wide symbol master, built on first use"""
+    global _master, _master_version
+    if _master is None:
+        with _master_lock:
+            if _master is None:
+                with open(DATA_PATH, 'rb') as f:
+                    data = f.read()
+                _master_version = hashlib.blake2b(data, digest_size=8).hexdigest()
+                _master = SymbolMaster(csv.DictReader(data.decode('utf-8').splitlines()))
+    return _master
+
+
+def master_version():
+    """Content hash of the loaded listings, for ETags"""
+    get_master()
+    return _master_version
@@ -0,0 +1,136 @@
+"""Stock universes the market-wide endpoints rank over.
+
+Index constituents are kept as NSE base symbols in api/_data/universes.csv.
+On BSE the same companies are looked up in the symbol master by ISIN,
+since a handful of them trade under a different code there. The 'all'
+universe is every listing of the exchange in the symbol master. The
+sector lists behind /api/sectors and the indices behind /api/indices
+live here too.
+"""
+import csv
+import os
+import threading
+
+from .symbols import get_master
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '_data', 'universes.csv')
+
+UNIVERSES = ('nifty50', 'nifty100', 'nifty200', 'nifty500', 'all')
+
+DEFAULT_UNIVERSE = 'nifty50'
+
+SUFFIXES = {'nse': '.NS', 'bse': '.BO'}
+
+# Sector-wise Indian stocks
+SECTORS = {
+    'Banking & Financial Services': {
+        'nse': ['HDFCBANK.NS', 'ICICIBANK.NS', 'SBIN.NS', 'KOTAKBANK.NS', 'AXISBANK.NS', 'BAJFINANCE.NS', 'BAJAJFINSV.NS', 'SBILIFE.NS', 'HDFCLIFE.NS'],
+        'bse': ['HDFCBANK.BO', 'ICICIBANK.BO', 'SBIN.BO', 'KOTAKBANK.BO', 'AXISBANK.BO', 'BAJFINANCE.BO', 'BAJAJFINSV.BO']
+    },
+    'Information Technology': {
+        'nse': ['TCS.NS', 'INFY.NS', 'WIPRO.NS', 'HCLTECH.NS', 'TECHM.NS', 'LTI.NS', 'MINDTREE.NS'],
+        'bse': ['TCS.BO', 'INFY.BO', 'WIPRO.BO', 'HCLTECH.BO', 'TECHM.BO']
+    },
+    'Oil & Gas': {
+        'nse': ['RELIANCE.NS', 'ONGC.NS', 'BPCL.NS', 'IOC.NS', 'HINDPETRO.NS', 'GAIL.NS'],
+        'bse': ['RELIANCE.BO', 'ONGC.BO', 'BPCL.BO', 'IOC.BO']
+    },
+    'Automobiles': {
+        'nse': ['MARUTI.NS', 'TATAMOTORS.NS', 'M&M.NS', 'BAJAJ-AUTO.NS', 'HEROMOTOCO.NS', 'EICHERMOT.NS', 'ASHOKLEY.NS'],
+        'bse': ['MARUTI.BO', 'TATAMOTORS.BO', 'M&M.BO', 'BAJAJ-AUTO.BO', 'HEROMOTOCO.BO']
+    },
+    'Pharmaceuticals': {
+        'nse': ['SUNPHARMA.NS', 'DIVISLAB.NS', 'CIPLA.NS', 'DRREDDY.NS', 'BIOCON.NS', 'LUPIN.NS'],
+        'bse': ['SUNPHARMA.BO', 'DIVISLAB.BO', 'CIPLA.BO', 'DRREDDY.BO']
+    },
+    'FMCG': {
+        'nse': ['HINDUNILVR.NS', 'ITC.NS', 'NESTLEIND.NS', 'BRITANNIA.NS', 'DABUR.NS', 'MARICO.NS'],
+        'bse': ['HINDUNILVR.BO', 'ITC.BO', 'NESTLEIND.BO', 'BRITANNIA.BO']
+    },
+    'Metals & Mining': {
+        'nse': ['TATASTEEL.NS', 'JSWSTEEL.NS', 'HINDALCO.NS', 'COALINDIA.NS', 'VEDL.NS', 'SAIL.NS'],
+        'bse': ['TATASTEEL.BO', 'JSWSTEEL.BO', 'HINDALCO.BO', 'COALINDIA.BO']
+    },
+    'Cement': {
+        'nse': ['ULTRACEMCO.NS', 'SHREECEM.NS', 'GRASIM.NS', 'AMBUJACEM.NS', 'ACC.NS'],
+        'bse': ['ULTRACEMCO.BO', 'SHREECEM.BO', 'GRASIM.BO', 'AMBUJACEM.BO']
+    },
+    'Textiles': {
+        'nse': ['WELSPUNIND.NS', 'ARVIND.NS', 'PAGEIND.NS', 'VIPIND.NS'],
+        'bse': ['WELSPUNIND.BO', 'ARVIND.BO']
+    },
+    'Telecommunications': {
+        'nse': ['BHARTIARTL.NS', 'IDEA.NS'],
+        'bse': ['BHARTIARTL.BO', 'IDEA.BO']
+    }
+}
+
+_constituents = None
+_resolved = {}
+_lock = threading.Lock()
+
+
+# Major Indian market indices
+INDICES = {
+    'NIFTY 50': '^NSEI',
+    'SENSEX': '^BSESN',
+    'NIFTY BANK': '^NSEBANK',
+    'NIFTY IT': '^CNXIT',
+    'NIFTY AUTO': '^CNXAUTO',
+    'NIFTY PHARMA': '^CNXPHARMA',
+    'NIFTY FMCG': '^CNXFMCG',
+    'NIFTY METAL': '^CNXMETAL',
+    'NIFTY REALTY': '^CNXREALTY',
+    'NIFTY ENERGY': '^CNXENERGY',
+    'NIFTY NEXT 50': '^NSMIDCP',
+    'NIFTY MIDCAP 100': '^NSEMDCP50'
+}
+
+def _load_constituents():
+    global _constituents
+    if _constituents is None:
+        with _lock:
+            if _constituents is None:
+                constituents = {}
+                with open(DATA_PATH, newline='') as f:
+                    for row in csv.DictReader(f):
+                        constituents.setdefault(row['universe'], []).append(row['symbol'])
+                _constituents = constituents
+    return _constituents
+
+
+def _resolve(universe, exchange):
+    master = get_master()
+    listings = master.listings
+    if universe == 'all':
+        return [listing['symbol'] for listing in listings if listing['exchange'] == exchange.upper()]
+
+    symbols = [base + '.NS' for base in _load_constituents().get(universe, [])]
+    if exchange == 'nse':
+        return symbols
+
+    isins = {listing['symbol']: listing['isin'] for listing in listings if listing['isin']}
+    bse_by_isin = {listing['isin']: listing['symbol'] for listing in listings
+                   if listing['exchange'] == 'BSE' and listing['isin']}
+    resolved = []
+    for symbol in symbols:
+        base = symbol[:-len('.NS')]
+        resolved.append(bse_by_isin.get(isins.get(symbol), base + '.BO'))
+    return resolved
+
+
+def universe_symbols(universe=DEFAULT_UNIVERSE, exchange='nse'):
+    """Yahoo symbols of a universe on an exchange, or raise ValueError for unknown ones"""
+    if universe not in UNIVERSES:
+        raise ValueError(f"Unknown universe: {universe}. Available universes: {', '.join(UNIVERSES)}")
+    if exchange not in SUFFIXES:
+        exchange = 'nse'
+    key = (universe, exchange)
+    if key not in _resolved:
+        _resolved[key] = _resolve(universe, exchange)
+    return _resolved[key]
+
+
+def sector_constituents(exchange='nse'):
+    """{sector name: symbols} on an exchange, falling back to the NSE list"""
+    return {sector: stocks.get(exchange, stocks.get('nse', [])) for sector, stocks in SECTORS.items()}
@@ -0,0 +1,245 @@
+"""Shared guard around every Yahoo call: rate limit, retries and a circuit breaker.
+
+All upstream calls in market_data and quotes go through call():
+
+- A token bucket keeps the process under YFINAPI_UPSTREAM_RATE requests
+  per second, allowing bursts of YFINAPI_UPSTREAM_BURST. A call that
+  would wait longer than MAX_WAIT for capacity fails at once instead.
+- Transient failures (throttling, connection errors, 5xx) are retried up
+  to RETRIES times with exponential backoff and full jitter, but never
+  past RETRY_BUDGET seconds, after which fetch_all has given up anyway.
+- After BREAKER_THRESHOLD transient failures in a row the circuit opens
+  and calls fail fast for BREAKER_RESET seconds; then a single probe call
+  decides whether it closes again. While Yahoo is degraded the budget
+  is not spent on calls that are bound to fail.
+
+Other errors (unknown symbol, bad parameters) mean Yahoo answered, so
+they are raised without retrying and count as a success for the breaker.
+
+yfinance 0.2.x swallows most request errors and returns empty data
+instead, so raise_for_throttling() is a response hook on the shared
+session that notes every 429 and 5xx for the thread that got it. An
+attempt that fails or comes back empty after its own thread saw such a
+response is treated as that transient error. yf.download fetches on
+threads of its own, outside any call(); their transient responses are
+logged separately for download_history (transient_mark/transient_since).
+"""
+import os
+import random
+import threading
+import time as _time
+from collections import deque
+
+from .fetcher import ITEM_TIMEOUT
+
+# Sustained Yahoo requests per second and the burst allowed on top
+RATE = float(os.environ.get('YFINAPI_UPSTREAM_RATE', 20))
+BURST = int(os.environ.get('YFINAPI_UPSTREAM_BURST', 40))
+
+# Seconds a call may wait for rate limit capacity
+MAX_WAIT = float(os.environ.get('YFINAPI_UPSTREAM_MAX_WAIT', 5))
+
+RETRIES = int(os.environ.get('YFINAPI_UPSTREAM_RETRIES', 2))
+
+# Backoff before retry n is uniform in [0, min(BACKOFF_CAP, BACKOFF * 2**n)]
+BACKOFF = float(os.environ.get('YFINAPI_UPSTREAM_BACKOFF', 0.5))
+BACKOFF_CAP = 4
+
+# No retry is started once a call has taken this long
+RETRY_BUDGET = ITEM_TIMEOUT
+
+BREAKER_THRESHOLD = int(os.environ.get('YFINAPI_BREAKER_THRESHOLD', 5))
+BREAKER_RESET = float(os.environ.get('YFINAPI_BREAKER_RESET', 30))
+
+_TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+_TRANSIENT_NAMES = ('Timeout', 'ConnectionError', 'RateLimit', 'ChunkedEncodingError')
+_TRANSIENT_TEXT = ('too many requests', 'rate limit', '429')
+
+# Transient responses of threads outside call() kept for bulk downloads to look back on
+_TRANSIENT_LOG_SIZE = 256
+
+
+class UpstreamError(Exception):
+    """A Yahoo call that was not made: no rate limit capacity or the circuit is open"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket; tokens go negative to queue callers in order"""
+
+    def __init__(self, rate=RATE, capacity=BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = _time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, cost=1, max_wait=MAX_WAIT):
+        """Take cost tokens, sleeping until they are available; False if that exceeds max_wait"""
+        with self._lock:
+            now = _time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = (cost - self._tokens) / self.rate
+            if wait > max_wait:
+                return False
+            self._tokens -= cost
+        if wait > 0:
+            _time.sleep(wait)
+        return True
+
+
+class CircuitBreaker:
+    """Closed -> open after threshold failures in a row -> one probe after reset seconds"""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset=BREAKER_RESET):
+        self.threshold = threshold
+        self.reset = reset
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go ahead; in the half-open state only one at a time does"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or _time.monotonic() < self._opened_at + self.reset:
+                return False
+            self._probing = True
+            return True
+
+    def retry_in(self):
+        """Seconds until the next probe is let through"""
+        with self._lock:
+            if self._opened_at is None:
+                return 0
+            return max(self._opened_at + self.reset - _time.monotonic(), 0)
+
+    def release(self):
+        """Give back a probe that was allowed but not made"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.threshold:
+                self._opened_at = _time.monotonic()
+            self._probing = False
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+
+# Process-wide, shared by every handler on a warm instance
+bucket = TokenBucket()
+breaker = CircuitBreaker()
+
+# Transient responses of the current call() attempt, per thread
+_attempt = threading.local()
+
+# Transient responses of threads not inside a call(): yf.download's workers
+_transient = deque(maxlen=_TRANSIENT_LOG_SIZE)
+_transient_count = 0
+_transient_lock = threading.Lock()
+
+
+def raise_for_throttling(response, *args, **kwargs):
+    """Session response hook: note and raise a 429 or 5xx from Yahoo as an HTTPError"""
+    if response.status_code not in _TRANSIENT_STATUS:
+        return
+    global _transient_count
+    try:
+        response.raise_for_status()
+    except Exception as error:
+        seen = getattr(_attempt, 'seen', None)
+        if seen is not None:
+            seen.append(error)
+        else:
+            with _transient_lock:
+                _transient_count += 1
+                _transient.append((_transient_count, error))
+        raise
+
+
+def transient_mark():
+    """Position in the log of transient responses outside call(), for transient_since()"""
+    with _transient_lock:
+        return _transient_count
+
+
+def transient_since(mark):
+    """HTTPErrors of the transient responses outside call() after mark, oldest first"""
+    with _transient_lock:
+        return [error for count, error in _transient if count > mark]
+
+
+def _is_empty(result):
+    """None, an empty frame or an empty dict: what yfinance returns when it swallowed an error"""
+    if result is None:
+        return True
+    empty = getattr(result, 'empty', None)
+    if isinstance(empty, bool):
+        return empty
+    return isinstance(result, dict) and not result
+
+
+def is_transient(error):
+    """Whether an error is Yahoo throttling or failing rather than rejecting the request"""
+    response = getattr(error, 'response', None)
+    if getattr(response, 'status_code', None) in _TRANSIENT_STATUS:
+        return True
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if any(name in cls.__name__ for cls in type(error).__mro__ for name in _TRANSIENT_NAMES):
+        return True
+    message = str(error).lower()
+    return any(text in message for text in _TRANSIENT_TEXT)
+
+
+def call(fn, *args, cost=1, **kwargs):
+    """fn(*args, **kwargs) under the shared rate limit, retry policy and circuit breaker.
+
+    cost is the number of Yahoo requests fn makes (a bulk download makes
+    one per symbol). A cost above the burst size waits longer than any
+    caller could, so bulk calls are split into batches of at most BURST.
+    """
+    started = _time.monotonic()
+    outer = getattr(_attempt, 'seen', None)
+    for attempt in range(RETRIES + 1):
+        if not breaker.allow():
+            raise UpstreamError(f"Yahoo is failing, calls paused for {breaker.retry_in():.0f}s")
+        if not bucket.acquire(cost):
+            breaker.release()
+            raise UpstreamError(f"Upstream rate limit of {RATE:g}/s reached")
+
+        seen = _attempt.seen = []
+        try:
+            result = fn(*args, **kwargs)
+            if seen and _is_empty(result):
+                raise seen[-1]
+        except Exception as e:
+            if not is_transient(e) and seen:
+                # yfinance replaced a throttled response with its own error
+                e = seen[-1]
+            if not is_transient(e):
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF * 2 ** attempt))
+            if attempt == RETRIES or breaker.is_open or _time.monotonic() - started + delay > RETRY_BUDGET:
+                raise e
+            _time.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
+        finally:
+            _attempt.seen = outer
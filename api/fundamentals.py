@@ -1,9 +1,109 @@
 from http.server import BaseHTTPRequestHandler
-import json
-import yfinance as yf
+import os
+import sys
 from urllib.parse import parse_qs, urlparse
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _lib.fetcher import fetch_all
+from _lib.fundamentals_store import load_fundamentals
+from _lib.market_data import get_info
+from _lib.responses import make_etag, send_json, send_not_modified
+from _lib.upstream import UpstreamError
+
+# Response section -> the upstream data it is built from. 'quote' is the
+# live Ticker.info (market-hours TTL): prices move during the session,
+# while the stored info is only refetched about daily
+SECTIONS = {
+    'company_info': 'info',
+    'market_data': 'info',
+    'valuation_metrics': 'info',
+    'financial_metrics': 'info',
+    'dividend_info': 'info',
+    'price_data': 'quote',
+    'trading_info': 'quote',
+    'analyst_info': 'info',
+    'recent_financials': 'financials',
+    'balance_sheet': 'balance_sheet',
+    'cashflow': 'cashflow',
+}
+
+# Short names accepted by sections=
+SECTION_ALIASES = {
+    'market': 'market_data',
+    'valuation': 'valuation_metrics',
+    'metrics': 'financial_metrics',
+    'dividends': 'dividend_info',
+    'price': 'price_data',
+    'trading': 'trading_info',
+    'analyst': 'analyst_info',
+    'financials': 'recent_financials',
+}
+
+# Sections returned when sections= is not given
+DEFAULT_SECTIONS = [section for section in SECTIONS if section not in ('balance_sheet', 'cashflow')]
+
+# Response field -> statement row, read from the most recent period
+STATEMENT_ROWS = {
+    'financials': {
+        "total_revenue": 'Total Revenue',
+        "gross_profit": 'Gross Profit',
+        "operating_income": 'Operating Income',
+        "net_income": 'Net Income'
+    },
+    'balance_sheet': {
+        "total_assets": 'Total Assets',
+        "total_liabilities": 'Total Liabilities Net Minority Interest',
+        "stockholders_equity": 'Stockholders Equity',
+        "total_debt": 'Total Debt',
+        "cash_and_equivalents": 'Cash And Cash Equivalents',
+        "working_capital": 'Working Capital'
+    },
+    'cashflow': {
+        "operating_cash_flow": 'Operating Cash Flow',
+        "capital_expenditure": 'Capital Expenditure',
+        "free_cash_flow": 'Free Cash Flow',
+        "dividends_paid": 'Cash Dividends Paid',
+        "investing_cash_flow": 'Investing Cash Flow',
+        "financing_cash_flow": 'Financing Cash Flow'
+    },
+}
+
+def parse_sections(value):
+    """Requested section names in response order, or raise ValueError for unknown ones"""
+    if not value:
+        return DEFAULT_SECTIONS
+    if value.lower() == 'all':
+        return list(SECTIONS)
+    
+    requested = set()
+    for name in value.lower().split(','):
+        name = SECTION_ALIASES.get(name.strip(), name.strip())
+        if name not in SECTIONS:
+            raise ValueError(f"Unknown section: {name}. Available sections: {', '.join(SECTIONS)}")
+        requested.add(name)
+    return [section for section in SECTIONS if section in requested]
+
+def load_source(symbol, source):
+    """Data behind the sections of one source"""
+    if source == 'quote':
+        return get_info(symbol)
+    return load_fundamentals(symbol, source)
+
+def statement_summary(statement, rows):
+    """Most recent column of a statement as {field: float}, None when unavailable"""
+    if statement is None or statement.empty:
+        return None
+    try:
+        latest = statement.iloc[:, 0]
+        summary = {"period_end": latest.name.strftime('%Y-%m-%d')}
+        for field, row in rows.items():
+            value = latest.get(row, 0)
+            summary[field] = float(value) if pd.notna(value) else 0
+        return summary
+    except:
+        return None
+
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         try:
@@ -14,32 +114,48 @@ class handler(BaseHTTPRequestHandler):
             symbol = query_params.get('symbol', [''])[0]
             
             if not symbol:
-                self.send_response(400)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({
+                send_json(self, {
                     "error": "Symbol parameter is required"
-                }).encode())
+                }, status=400)
                 return
             
-            # Fetch stock data
-            stock = yf.Ticker(symbol)
-            info = stock.info
-            
-            # Get financial data
             try:
-                financials = stock.financials
-                balance_sheet = stock.balance_sheet
-                cashflow = stock.cashflow
-            except:
-                financials = None
-                balance_sheet = None
-                cashflow = None
+                sections = parse_sections(query_params.get('sections', [''])[0])
+            except ValueError as e:
+                send_json(self, {
+                    "error": str(e)
+                }, status=400)
+                return
+            
+            # Only load the data backing the requested sections. Apart from the
+            # live quote it comes from the local store, and from Yahoo only
+            # when a new period is due
+            sources = list(dict.fromkeys(SECTIONS[section] for section in sections))
+            data, errors = fetch_all(lambda source: load_source(symbol, source), sources)
+            if 'quote' in errors:
+                # The stored info carries the last prices Yahoo gave
+                try:
+                    data['quote'] = data.get('info') or load_fundamentals(symbol, 'info')
+                except Exception:
+                    raise UpstreamError(errors['quote'])
+            if 'info' in errors:
+                # Neither Yahoo nor the store has it
+                raise UpstreamError(errors['info'])
+            
+            # Statements are optional; a failed one is reported as null
+            info = data.get('info', {})
+            quote = data.get('quote', {})
+            statements = {source: data.get(source) for source in sources if source not in ('info', 'quote')}
+            
+            etag = make_etag(self, sections, info, quote, [
+                statement.to_numpy().tobytes() if statement is not None else None
+                for statement in statements.values()
+            ])
+            if send_not_modified(self, etag):
+                return
             
             # Prepare fundamentals data
-            fundamentals = {
-                "symbol": symbol,
+            available = {
                 "company_info": {
                     "name": info.get('longName', info.get('shortName', '')),
                     "sector": info.get('sector', ''),
@@ -85,23 +201,23 @@ class handler(BaseHTTPRequestHandler):
                     "dividend_date": info.get('dividendDate', '')
                 },
                 "price_data": {
-                    "current_price": info.get('currentPrice', 0),
-                    "previous_close": info.get('previousClose', 0),
-                    "day_high": info.get('dayHigh', 0),
-                    "day_low": info.get('dayLow', 0),
-                    "52_week_high": info.get('fiftyTwoWeekHigh', 0),
-                    "52_week_low": info.get('fiftyTwoWeekLow', 0),
-                    "50_day_average": info.get('fiftyDayAverage', 0),
-                    "200_day_average": info.get('twoHundredDayAverage', 0)
+                    "current_price": quote.get('currentPrice', 0),
+                    "previous_close": quote.get('previousClose', 0),
+                    "day_high": quote.get('dayHigh', 0),
+                    "day_low": quote.get('dayLow', 0),
+                    "52_week_high": quote.get('fiftyTwoWeekHigh', 0),
+                    "52_week_low": quote.get('fiftyTwoWeekLow', 0),
+                    "50_day_average": quote.get('fiftyDayAverage', 0),
+                    "200_day_average": quote.get('twoHundredDayAverage', 0)
                 },
                 "trading_info": {
-                    "volume": info.get('volume', 0),
-                    "average_volume": info.get('averageVolume', 0),
-                    "average_volume_10days": info.get('averageVolume10days', 0),
-                    "bid": info.get('bid', 0),
-                    "ask": info.get('ask', 0),
-                    "bid_size": info.get('bidSize', 0),
-                    "ask_size": info.get('askSize', 0)
+                    "volume": quote.get('volume', 0),
+                    "average_volume": quote.get('averageVolume', 0),
+                    "average_volume_10days": quote.get('averageVolume10days', 0),
+                    "bid": quote.get('bid', 0),
+                    "ask": quote.get('ask', 0),
+                    "bid_size": quote.get('bidSize', 0),
+                    "ask_size": quote.get('askSize', 0)
                 },
                 "analyst_info": {
                     "target_high_price": info.get('targetHighPrice', 0),
@@ -114,32 +230,22 @@ class handler(BaseHTTPRequestHandler):
                 }
             }
             
-            # Add financial statements summary if available
-            if financials is not None and not financials.empty:
-                try:
-                    latest_financials = financials.iloc[:, 0].to_dict()
-                    fundamentals["recent_financials"] = {
-                        "total_revenue": float(latest_financials.get('Total Revenue', 0)) if pd.notna(latest_financials.get('Total Revenue', 0)) else 0,
-                        "gross_profit": float(latest_financials.get('Gross Profit', 0)) if pd.notna(latest_financials.get('Gross Profit', 0)) else 0,
-                        "operating_income": float(latest_financials.get('Operating Income', 0)) if pd.notna(latest_financials.get('Operating Income', 0)) else 0,
-                        "net_income": float(latest_financials.get('Net Income', 0)) if pd.notna(latest_financials.get('Net Income', 0)) else 0
-                    }
-                except:
-                    fundamentals["recent_financials"] = None
-            else:
-                fundamentals["recent_financials"] = None
+            # Add financial statements summaries if available
+            for source, statement in statements.items():
+                section = 'recent_financials' if source == 'financials' else source
+                available[section] = statement_summary(statement, STATEMENT_ROWS[source])
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(fundamentals, indent=2).encode())
+            fundamentals = {"symbol": symbol}
+            for section in sections:
+                fundamentals[section] = available[section]
             
+            send_json(self, fundamentals, etag=etag)
+            
+        except UpstreamError as e:
+            send_json(self, {
+                "error": str(e)
+            }, status=503)
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            send_json(self, {
                 "error": str(e)
-            }).encode())
\ No newline at end of file
+            }, status=500)
\ No newline at end of file
@@ -1,22 +1,33 @@
 from http.server import BaseHTTPRequestHandler
-import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _lib.responses import STATIC_CACHE_CONTROL, make_etag, send_json, send_not_modified
+
+API_VERSION = "1.0.0"
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         try:
+            # The docs only change on deploy
+            etag = make_etag(self, API_VERSION)
+            if send_not_modified(self, etag, STATIC_CACHE_CONTROL):
+                return
+            
             # API Documentation
             api_docs = {
                 "api_name": "Indian Stocks Data API",
-                "version": "1.0.0",
+                "version": API_VERSION,
                 "description": "Comprehensive Indian stock market data API using yfinance",
                 "base_url": "https://your-vercel-app.vercel.app/api",
                 "endpoints": {
                     "search": {
                         "url": "/api/search",
                         "method": "GET",
-                        "description": "Search for Indian stock symbols",
+                        "description": "Search NSE/BSE listings by symbol or company name; handles partial input (autocomplete) and typos",
                         "parameters": {
-                            "q": "Search query (required)",
+                            "q": "Search query (required) - symbol or company name, e.g. SBIN, state bank",
                             "exchange": "nse|bse|both (default: both)",
                             "limit": "Number of results (default: 50)"
                         },
@@ -25,9 +36,11 @@ class handler(BaseHTTPRequestHandler):
                     "latest_stock_data": {
                         "url": "/api/stock/latest",
                         "method": "GET",
-                        "description": "Get latest data for a specific stock",
+                        "description": "Get latest data for a specific stock, or for a whole watchlist at once",
                         "parameters": {
-                            "symbol": "Stock symbol (required) - e.g., RELIANCE.NS"
+                            "symbol": "Stock symbol (required unless symbols is given) - e.g., RELIANCE.NS",
+                            "symbols": "Comma-separated symbols (up to 500) - returns a map keyed by symbol, with an error entry for symbols without data",
+                            "fields": "Optional - comma-separated latest_data, company_info, rolling_stats, or all (default: latest_data). company_info is slower on a cold cache"
                         },
                         "example": "/api/stock/latest?symbol=RELIANCE.NS"
                     },
@@ -40,16 +53,33 @@ class handler(BaseHTTPRequestHandler):
                             "start": "Start date (YYYY-MM-DD) - optional",
                             "end": "End date (YYYY-MM-DD) - optional",
                             "period": "1d|5d|1mo|3mo|6mo|1y|2y|5y|10y|ytd|max (default: 1mo)",
-                            "interval": "1m|2m|5m|15m|30m|60m|90m|1h|1d|5d|1wk|1mo|3mo (default: 1d)"
+                            "interval": "1m|2m|5m|15m|30m|60m|90m|1h|1d|5d|1wk|1mo|3mo (default: 1d)",
+                            "format": "json|ndjson (default: json) - ndjson streams one bar per line with the summary as the last line",
+                            "stream": "1 - same as format=ndjson"
                         },
                         "example": "/api/stock/historical?symbol=TCS.NS&period=6mo&interval=1d"
                     },
+                    "technical_indicators": {
+                        "url": "/api/stock/indicators",
+                        "method": "GET",
+                        "description": "Technical indicators computed on the same bars as historical_data",
+                        "parameters": {
+                            "symbol": "Stock symbol (required)",
+                            "indicators": "Comma-separated name:params (required) - sma:20, ema:20, rsi:14, macd:12:26:9, bbands:20:2, atr:14; params default as shown",
+                            "start": "Start date (YYYY-MM-DD) - optional",
+                            "end": "End date (YYYY-MM-DD) - optional",
+                            "period": "1d|5d|1mo|3mo|6mo|1y|2y|5y|10y|ytd|max (default: 1y)",
+                            "interval": "1m|2m|5m|15m|30m|60m|90m|1h|1d|5d|1wk|1mo|3mo (default: 1d)"
+                        },
+                        "example": "/api/stock/indicators?symbol=TCS.NS&indicators=rsi:14,ema:50,macd"
+                    },
                     "trending_stocks": {
                         "url": "/api/trending",
                         "method": "GET",
                         "description": "Get trending stocks by trading volume",
                         "parameters": {
                             "exchange": "nse|bse (default: nse)",
+                            "universe": "nifty50|nifty100|nifty200|nifty500|all (default: nifty50)",
                             "limit": "Number of results (default: 20)"
                         },
                         "example": "/api/trending?exchange=nse&limit=15"
@@ -60,9 +90,10 @@ class handler(BaseHTTPRequestHandler):
                         "description": "Get top gaining stocks",
                         "parameters": {
                             "exchange": "nse|bse (default: nse)",
+                            "universe": "nifty50|nifty100|nifty200|nifty500|all (default: nifty50)",
                             "limit": "Number of results (default: 20)"
                         },
-                        "example": "/api/gainers?exchange=bse&limit=10"
+                        "example": "/api/gainers?universe=nifty500&limit=10"
                     },
                     "top_losers": {
                         "url": "/api/losers",
@@ -70,6 +101,7 @@ class handler(BaseHTTPRequestHandler):
                         "description": "Get top losing stocks",
                         "parameters": {
                             "exchange": "nse|bse (default: nse)",
+                            "universe": "nifty50|nifty100|nifty200|nifty500|all (default: nifty50)",
                             "limit": "Number of results (default: 20)"
                         },
                         "example": "/api/losers?exchange=nse&limit=15"
@@ -77,36 +109,42 @@ class handler(BaseHTTPRequestHandler):
                     "market_indices": {
                         "url": "/api/indices",
                         "method": "GET",
-                        "description": "Get major Indian market indices (NIFTY, SENSEX, etc.)",
+                        "description": "Get major Indian market indices (NIFTY, SENSEX, etc.) with previous close, 52-week range and 50/200-day averages",
                         "parameters": {
-                            "period": "1d|5d|1mo|3mo|6mo|1y (default: 1d)"
+                            "period": "1d|5d|1mo|3mo|6mo|1y - window of period_change_percent (default: 1d)"
                         },
-                        "example": "/api/indices?period=1d"
+                        "example": "/api/indices?period=1mo"
                     },
                     "market_status": {
                         "url": "/api/market-status",
                         "method": "GET",
                         "description": "Get current market status and trading hours",
-                        "parameters": "None",
+                        "parameters": {
+                            "snapshot": "0|1 - include NIFTY 50 and SENSEX values (default: 1); 0 answers from the clock alone"
+                        },
                         "example": "/api/market-status"
                     },
                     "sectors": {
                         "url": "/api/sectors",
                         "method": "GET",
-                        "description": "Get sector-wise stock performance",
+                        "description": "Get sector-wise stock performance: breadth, equal- and market-cap-weighted change, turnover and top/bottom constituents",
                         "parameters": {
-                            "exchange": "nse|bse (default: nse)"
+                            "exchange": "nse|bse (default: nse)",
+                            "universe": "nifty50|nifty100|nifty200|nifty500|all - group the universe by Yahoo sector (default: curated sector lists)",
+                            "sector": "Only this sector, e.g. FMCG",
+                            "top": "Best and worst constituents per sector (default: 3)"
                         },
-                        "example": "/api/sectors?exchange=nse"
+                        "example": "/api/sectors?universe=nifty500&sector=Technology"
                     },
                     "fundamentals": {
                         "url": "/api/fundamentals",
                         "method": "GET",
                         "description": "Get comprehensive fundamental data for a stock",
                         "parameters": {
-                            "symbol": "Stock symbol (required) - e.g., HDFCBANK.NS"
+                            "symbol": "Stock symbol (required) - e.g., HDFCBANK.NS",
+                            "sections": "Optional - comma-separated company_info, market_data, valuation_metrics, financial_metrics, dividend_info, price_data, trading_info, analyst_info, recent_financials, balance_sheet, cashflow, or all (default: everything except balance_sheet and cashflow). Short names: market, valuation, metrics, dividends, price, trading, analyst, financials"
                         },
-                        "example": "/api/fundamentals?symbol=HDFCBANK.NS"
+                        "example": "/api/fundamentals?symbol=HDFCBANK.NS&sections=valuation,balance_sheet"
                     }
                 },
                 "common_stock_symbols": {
@@ -132,26 +170,22 @@ class handler(BaseHTTPRequestHandler):
                     "Market hours: 9:15 AM to 3:30 PM IST (Monday to Friday)",
                     "NSE symbols end with .NS, BSE symbols end with .BO",
                     "Historical data may have limitations based on yfinance availability",
-                    "Rate limiting may apply for excessive requests"
+                    "Rate limiting may apply for excessive requests",
+                    "Market-wide endpoints list symbols without data under skipped, with the reason",
+                    "Responses are compact JSON; add pretty=1 to any endpoint for indented output",
+                    "Responses over 1 KB are gzip/brotli compressed when the client sends Accept-Encoding"
                 ],
                 "error_handling": {
                     "400": "Bad Request - Missing required parameters",
                     "404": "Not Found - Symbol not found or no data available",
-                    "500": "Internal Server Error - API processing error"
+                    "500": "Internal Server Error - API processing error",
+                    "503": "Service Unavailable - Yahoo is throttling or failing; retry later"
                 }
             }
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(api_docs, indent=2).encode())
+            send_json(self, api_docs, etag=etag, cache_control=STATIC_CACHE_CONTROL)
             
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            send_json(self, {
                 "error": str(e)
-            }).encode())
\ No newline at end of file
+            }, status=500)
\ No newline at end of file
@@ -1,8 +1,17 @@
 from http.server import BaseHTTPRequestHandler
-import json
-import yfinance as yf
+import os
+import sys
 from urllib.parse import parse_qs, urlparse
-import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _lib.fetcher import fetch_all
+from _lib.responses import make_etag, send_json, send_not_modified
+from _lib.rolling_stats import PERIODS, index_quote
+from _lib.universes import INDICES
+
+def rounded(value):
+    """value rounded to 2 places, or None when it is unknown"""
+    return None if value is None else round(value, 2)
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
@@ -13,54 +22,72 @@ class handler(BaseHTTPRequestHandler):
             
             period = query_params.get('period', ['1d'])[0]
             
-            # Major Indian market indices
-            indices = {
-                'NIFTY 50': '^NSEI',
-                'SENSEX': '^BSESN',
-                'NIFTY BANK': '^NSEBANK',
-                'NIFTY IT': '^CNXIT',
-                'NIFTY AUTO': '^CNXAUTO',
-                'NIFTY PHARMA': '^CNXPHARMA',
-                'NIFTY FMCG': '^CNXFMCG',
-                'NIFTY METAL': '^CNXMETAL',
-                'NIFTY REALTY': '^CNXREALTY',
-                'NIFTY ENERGY': '^CNXENERGY',
-                'NIFTY NEXT 50': '^NSMIDCP',
-                'NIFTY MIDCAP 100': '^NSEMDCP50'
-            }
+            if period not in PERIODS:
+                send_json(self, {
+                    "error": f"Unsupported period: {period}. Use one of {', '.join(PERIODS)}"
+                }, status=400)
+                return
+            
+            indices = INDICES
             
             indices_data = []
             
+            # Fetch every index in parallel under a shared deadline; only the
+            # current session's bar is fetched, the rest comes from aggregates
+            # over the stored daily bars, computed once per session
+            results, errors = fetch_all(lambda symbol: index_quote(symbol, period), indices.values())
+            
+            # Yahoo failing or throttled for every index; do not cache an empty list
+            if len(errors) == len(indices):
+                send_json(self, {
+                    "error": "No index data available from Yahoo",
+                    "skipped": [{"symbol": symbol, "reason": error} for symbol, error in errors.items()]
+                }, status=503)
+                return
+            
+            # Latest bar and aggregates of every index identify the response
+            etag = make_etag(self, [
+                (symbol, results[symbol][0].index[-1], results[symbol][0].iloc[-1].to_numpy().tobytes(), results[symbol][1])
+                for symbol in indices.values() if symbol in results and not results[symbol][0].empty
+            ])
+            if send_not_modified(self, etag):
+                return
+            
+            # Indices without data are reported with the reason instead of dropped
+            skipped = []
             for index_name, symbol in indices.items():
-                try:
-                    index_ticker = yf.Ticker(symbol)
-                    history = index_ticker.history(period=period)
-                    info = index_ticker.info
-                    
-                    if not history.empty:
-                        latest = history.iloc[-1]
-                        previous = history.iloc[-2] if len(history) > 1 else history.iloc[0]
-                        
-                        change = float(latest['Close'] - previous['Close'])
-                        change_percent = ((float(latest['Close']) - float(previous['Close'])) / float(previous['Close'])) * 100
-                        
-                        indices_data.append({
-                            "name": index_name,
-                            "symbol": symbol,
-                            "current_value": round(float(latest['Close']), 2),
-                            "previous_close": round(float(previous['Close']), 2),
-                            "change": round(change, 2),
-                            "change_percent": round(change_percent, 2),
-                            "day_high": round(float(latest['High']), 2),
-                            "day_low": round(float(latest['Low']), 2),
-                            "volume": int(latest['Volume']) if latest['Volume'] > 0 else 0,
-                            "date": latest.name.strftime('%Y-%m-%d'),
-                            "52_week_high": round(float(max(history['High'])), 2),
-                            "52_week_low": round(float(min(history['Low'])), 2)
-                        })
-                except Exception as e:
-                    print(f"Error fetching data for {index_name}: {e}")
+                if symbol in errors:
+                    skipped.append({"name": index_name, "symbol": symbol, "reason": errors[symbol]})
+                    continue
+                history, stats = results[symbol]
+                if history.empty:
+                    skipped.append({"name": index_name, "symbol": symbol, "reason": "no data for the latest session"})
                     continue
+                
+                latest = history.iloc[-1]
+                current = float(latest['Close'])
+                previous_close = stats['previous_close'] if stats['previous_close'] is not None else current
+                
+                change = current - previous_close
+                change_percent = change / previous_close * 100
+                
+                indices_data.append({
+                    "name": index_name,
+                    "symbol": symbol,
+                    "current_value": round(current, 2),
+                    "previous_close": round(previous_close, 2),
+                    "change": round(change, 2),
+                    "change_percent": round(change_percent, 2),
+                    "day_high": round(float(latest['High']), 2),
+                    "day_low": round(float(latest['Low']), 2),
+                    "volume": int(latest['Volume']) if latest['Volume'] > 0 else 0,
+                    "date": latest.name.strftime('%Y-%m-%d'),
+                    "52_week_high": round(stats['52_week_high'], 2),
+                    "52_week_low": round(stats['52_week_low'], 2),
+                    "50_day_average": rounded(stats['50_day_average']),
+                    "200_day_average": rounded(stats['200_day_average']),
+                    "period_change_percent": rounded(stats['period_change_percent'])
+                })
             
             # Sort by change percentage
             indices_data.sort(key=lambda x: x['change_percent'], reverse=True)
@@ -69,11 +96,7 @@ class handler(BaseHTTPRequestHandler):
             total_gainers = len([idx for idx in indices_data if idx['change'] > 0])
             total_losers = len([idx for idx in indices_data if idx['change'] < 0])
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            send_json(self, {
                 "period": period,
                 "total_indices": len(indices_data),
                 "market_summary": {
@@ -81,14 +104,11 @@ class handler(BaseHTTPRequestHandler):
                     "total_losers": total_losers,
                     "unchanged": len(indices_data) - total_gainers - total_losers
                 },
-                "indices": indices_data
-            }, indent=2).encode())
+                "indices": indices_data,
+                "skipped": skipped
+            }, etag=etag)
             
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            send_json(self, {
                 "error": str(e)
-            }).encode())
\ No newline at end of file
+            }, status=500)
\ No newline at end of file
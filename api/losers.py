@@ -1,8 +1,14 @@
 from http.server import BaseHTTPRequestHandler
-import json
-import yfinance as yf
+import os
+import sys
 from urllib.parse import parse_qs, urlparse
-import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _lib.quotes import quote_fingerprint, rank_movers
+from _lib.responses import make_etag, send_json, send_not_modified
+from _lib.snapshot import get_snapshot, skipped_records, snapshot_records, with_metadata
+from _lib.upstream import UpstreamError
+from _lib.universes import DEFAULT_UNIVERSE
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
@@ -14,82 +20,46 @@ class handler(BaseHTTPRequestHandler):
             exchange = query_params.get('exchange', ['nse'])[0].lower()
             limit = int(query_params.get('limit', [20])[0])
             
-            # Top Indian stocks to check for losers
-            stocks_to_check = {
-                'nse': [
-                    'RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'INFY.NS', 'HINDUNILVR.NS',
-                    'ICICIBANK.NS', 'BHARTIARTL.NS', 'SBIN.NS', 'ITC.NS', 'LT.NS',
-                    'KOTAKBANK.NS', 'AXISBANK.NS', 'ASIANPAINT.NS', 'MARUTI.NS', 'SUNPHARMA.NS',
-                    'TITAN.NS', 'ULTRACEMCO.NS', 'ONGC.NS', 'NESTLEIND.NS', 'WIPRO.NS',
-                    'POWERGRID.NS', 'NTPC.NS', 'BAJFINANCE.NS', 'HCLTECH.NS', 'TECHM.NS',
-                    'M&M.NS', 'TATAMOTORS.NS', 'COALINDIA.NS', 'DIVISLAB.NS', 'BAJAJFINSV.NS',
-                    'GRASIM.NS', 'ADANIPORTS.NS', 'JSWSTEEL.NS', 'HINDALCO.NS', 'TATASTEEL.NS',
-                    'CIPLA.NS', 'DRREDDY.NS', 'EICHERMOT.NS', 'APOLLOHOSP.NS', 'BRITANNIA.NS'
-                ],
-                'bse': [
-                    'RELIANCE.BO', 'TCS.BO', 'HDFCBANK.BO', 'INFY.BO', 'HINDUNILVR.BO',
-                    'ICICIBANK.BO', 'BHARTIARTL.BO', 'SBIN.BO', 'ITC.BO', 'LT.BO',
-                    'KOTAKBANK.BO', 'AXISBANK.BO', 'ASIANPAINT.BO', 'MARUTI.BO', 'SUNPHARMA.BO',
-                    'TITAN.BO', 'ULTRACEMCO.BO', 'ONGC.BO', 'NESTLEIND.BO', 'WIPRO.BO',
-                    'POWERGRID.BO', 'NTPC.BO', 'BAJFINANCE.BO', 'HCLTECH.BO', 'TECHM.BO'
-                ]
-            }
+            universe = query_params.get('universe', [DEFAULT_UNIVERSE])[0].lower()
+            
+            # A view over the shared market snapshot; upstream is only hit
+            # when the snapshot is due for a rebuild
+            try:
+                quotes = get_snapshot(exchange, universe)
+            except ValueError as e:
+                send_json(self, {
+                    "error": str(e)
+                }, status=400)
+                return
             
-            stocks_list = stocks_to_check.get(exchange, stocks_to_check['nse'])
-            losers_data = []
+            # Nothing to rebuild if the client already has these quotes
+            etag = make_etag(self, quote_fingerprint(quotes))
+            if send_not_modified(self, etag):
+                return
             
-            for symbol in stocks_list:
-                try:
-                    stock = yf.Ticker(symbol)
-                    history = stock.history(period="2d")
-                    info = stock.info
-                    
-                    if len(history) >= 2:
-                        latest = history.iloc[-1]
-                        previous = history.iloc[-2]
-                        
-                        change = float(latest['Close'] - previous['Close'])
-                        change_percent = ((float(latest['Close']) - float(previous['Close'])) / float(previous['Close'])) * 100
-                        
-                        if change < 0:  # Only losers
-                            losers_data.append({
-                                "symbol": symbol,
-                                "name": info.get('longName', info.get('shortName', symbol.replace('.NS', '').replace('.BO', ''))),
-                                "current_price": round(float(latest['Close']), 2),
-                                "previous_close": round(float(previous['Close']), 2),
-                                "change": round(change, 2),
-                                "change_percent": round(change_percent, 2),
-                                "volume": int(latest['Volume']),
-                                "high": round(float(latest['High']), 2),
-                                "low": round(float(latest['Low']), 2),
-                                "market_cap": info.get('marketCap', 0),
-                                "sector": info.get('sector', ''),
-                                "exchange": exchange.upper()
-                            })
-                except Exception as e:
-                    print(f"Error fetching data for {symbol}: {e}")
-                    continue
+            # Top-k selection over the change vector; no full sort of the universe
+            top = with_metadata(rank_movers(quotes, limit)[1])
             
-            # Sort by change percentage (biggest losers first)
-            losers_data.sort(key=lambda x: x['change_percent'])
-            losers_data = losers_data[:limit]
+            losers_data = snapshot_records(top, [
+                'current_price', 'previous_close', 'change', 'change_percent',
+                'volume', 'high', 'low'
+            ], exchange)
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            send_json(self, {
                 "exchange": exchange.upper(),
-                "date": history.index[-1].strftime('%Y-%m-%d') if not history.empty else None,
+                "universe": universe,
+                "date": quotes['date'].max() if not quotes.empty else None,
                 "total_losers": len(losers_data),
-                "top_losers": losers_data
-            }, indent=2).encode())
+                "top_losers": losers_data,
+                # Universe symbols Yahoo returned no quote for, and why
+                "skipped": skipped_records(quotes)
+            }, etag=etag)
             
+        except UpstreamError as e:
+            send_json(self, {
+                "error": str(e)
+            }, status=503)
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            send_json(self, {
                 "error": str(e)
-            }).encode())
\ No newline at end of file
+            }, status=500)
\ No newline at end of file
@@ -1,73 +1,65 @@
 from http.server import BaseHTTPRequestHandler
-import json
-import yfinance as yf
+import os
+import sys
 from urllib.parse import parse_qs, urlparse
-from datetime import datetime, time
-import pytz
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _lib.market_hours import market_status as get_market_status, now_ist, seconds_until_next_transition
+from _lib.responses import make_etag, market_cache_control, send_json, send_not_modified
+
+# current_time moves on every second, so the edge only keeps a response briefly
+STATUS_TTL = 5
+
+def index_snapshot(symbol):
+    """Latest session's value, range and volume of an index, or None without data.
+
+    Market data (and with it pandas and yfinance) is only imported here, so
+    a status-only request (snapshot=0) never loads it.
+    """
+    from _lib.market_data import get_history
+    
+    try:
+        history = get_history(symbol, period="1d")
+    except Exception:
+        return None
+    if history.empty:
+        return None
+    latest = history.iloc[-1]
+    return {
+        "current_value": round(float(latest['Close']), 2),
+        "day_high": round(float(latest['High']), 2),
+        "day_low": round(float(latest['Low']), 2),
+        "volume": int(latest['Volume'])
+    }
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         try:
             # Indian market timezone
-            ist = pytz.timezone('Asia/Kolkata')
-            current_time = datetime.now(ist)
-            
-            # NSE/BSE market hours (IST)
-            market_open = time(9, 15)  # 9:15 AM
-            market_close = time(15, 30)  # 3:30 PM
-            
-            current_time_only = current_time.time()
-            is_weekend = current_time.weekday() >= 5  # Saturday = 5, Sunday = 6
+            current_time = now_ist()
             
             # Determine market status
-            if is_weekend:
-                market_status = "CLOSED"
-                status_reason = "Weekend"
-            elif market_open <= current_time_only <= market_close:
-                market_status = "OPEN"
-                status_reason = "Regular trading hours"
+            market_status, status_reason = get_market_status(current_time)
+            
+            # NIFTY 50 and SENSEX for the market snapshot, unless only the status is wanted
+            parsed_url = urlparse(self.path)
+            query_params = parse_qs(parsed_url.query)
+            if query_params.get('snapshot', ['1'])[0] != '0':
+                nifty_data = index_snapshot('^NSEI')
+                sensex_data = index_snapshot('^BSESN')
             else:
-                market_status = "CLOSED"
-                status_reason = "Outside trading hours"
+                nifty_data = sensex_data = None
             
-            # Get NIFTY 50 for market snapshot
-            try:
-                nifty = yf.Ticker('^NSEI')
-                nifty_history = nifty.history(period="1d")
-                
-                if not nifty_history.empty:
-                    nifty_latest = nifty_history.iloc[-1]
-                    nifty_data = {
-                        "current_value": round(float(nifty_latest['Close']), 2),
-                        "day_high": round(float(nifty_latest['High']), 2),
-                        "day_low": round(float(nifty_latest['Low']), 2),
-                        "volume": int(nifty_latest['Volume'])
-                    }
-                else:
-                    nifty_data = None
-            except:
-                nifty_data = None
+            # Never cached across an open or close, when the status flips
+            cache_control = market_cache_control(min(STATUS_TTL, seconds_until_next_transition(current_time)))
+            formatted_time = current_time.strftime('%Y-%m-%d %H:%M:%S %Z')
             
-            # Get SENSEX for market snapshot
-            try:
-                sensex = yf.Ticker('^BSESN')
-                sensex_history = sensex.history(period="1d")
-                
-                if not sensex_history.empty:
-                    sensex_latest = sensex_history.iloc[-1]
-                    sensex_data = {
-                        "current_value": round(float(sensex_latest['Close']), 2),
-                        "day_high": round(float(sensex_latest['High']), 2),
-                        "day_low": round(float(sensex_latest['Low']), 2),
-                        "volume": int(sensex_latest['Volume'])
-                    }
-                else:
-                    sensex_data = None
-            except:
-                sensex_data = None
+            etag = make_etag(self, formatted_time, market_status, nifty_data, sensex_data)
+            if send_not_modified(self, etag, cache_control):
+                return
             
             response_data = {
-                "current_time": current_time.strftime('%Y-%m-%d %H:%M:%S %Z'),
+                "current_time": formatted_time,
                 "market_status": market_status,
                 "status_reason": status_reason,
                 "trading_hours": {
@@ -97,20 +89,12 @@ class handler(BaseHTTPRequestHandler):
                 }
             }
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(response_data, indent=2).encode())
+            send_json(self, response_data, etag=etag, cache_control=cache_control)
             
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            send_json(self, {
                 "error": str(e)
-            }).encode())
+            }, status=500)
     
     def get_next_trading_day(self, current_time):
         """Get next trading day (skip weekends)"""
@@ -1,8 +1,18 @@
 from http.server import BaseHTTPRequestHandler
-import json
-import yfinance as yf
+import os
+import sys
 from urllib.parse import parse_qs, urlparse
-import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _lib.quotes import quote_fingerprint
+from _lib.responses import make_etag, send_json, send_not_modified
+from _lib.sector_stats import ranked_constituents, sector_members, sector_table
+from _lib.snapshot import get_snapshot, skipped_records, snapshot_records
+from _lib.upstream import UpstreamError
+
+def rounded(value):
+    """value rounded to 2 places, or None for NaN"""
+    return None if value != value else round(float(value), 2)
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
@@ -12,136 +22,82 @@ class handler(BaseHTTPRequestHandler):
             query_params = parse_qs(parsed_url.query)
             
             exchange = query_params.get('exchange', ['nse'])[0].lower()
+            universe = query_params.get('universe', [''])[0].lower() or None
+            sector = query_params.get('sector', [None])[0]
+            top = int(query_params.get('top', [3])[0])
             
-            # Sector-wise Indian stocks
-            sectors = {
-                'Banking & Financial Services': {
-                    'nse': ['HDFCBANK.NS', 'ICICIBANK.NS', 'SBIN.NS', 'KOTAKBANK.NS', 'AXISBANK.NS', 'BAJFINANCE.NS', 'BAJAJFINSV.NS', 'SBILIFE.NS', 'HDFCLIFE.NS'],
-                    'bse': ['HDFCBANK.BO', 'ICICIBANK.BO', 'SBIN.BO', 'KOTAKBANK.BO', 'AXISBANK.BO', 'BAJFINANCE.BO', 'BAJAJFINSV.BO']
-                },
-                'Information Technology': {
-                    'nse': ['TCS.NS', 'INFY.NS', 'WIPRO.NS', 'HCLTECH.NS', 'TECHM.NS', 'LTI.NS', 'MINDTREE.NS'],
-                    'bse': ['TCS.BO', 'INFY.BO', 'WIPRO.BO', 'HCLTECH.BO', 'TECHM.BO']
-                },
-                'Oil & Gas': {
-                    'nse': ['RELIANCE.NS', 'ONGC.NS', 'BPCL.NS', 'IOC.NS', 'HINDPETRO.NS', 'GAIL.NS'],
-                    'bse': ['RELIANCE.BO', 'ONGC.BO', 'BPCL.BO', 'IOC.BO']
-                },
-                'Automobiles': {
-                    'nse': ['MARUTI.NS', 'TATAMOTORS.NS', 'M&M.NS', 'BAJAJ-AUTO.NS', 'HEROMOTOCO.NS', 'EICHERMOT.NS', 'ASHOKLEY.NS'],
-                    'bse': ['MARUTI.BO', 'TATAMOTORS.BO', 'M&M.BO', 'BAJAJ-AUTO.BO', 'HEROMOTOCO.BO']
-                },
-                'Pharmaceuticals': {
-                    'nse': ['SUNPHARMA.NS', 'DIVISLAB.NS', 'CIPLA.NS', 'DRREDDY.NS', 'BIOCON.NS', 'LUPIN.NS'],
-                    'bse': ['SUNPHARMA.BO', 'DIVISLAB.BO', 'CIPLA.BO', 'DRREDDY.BO']
-                },
-                'FMCG': {
-                    'nse': ['HINDUNILVR.NS', 'ITC.NS', 'NESTLEIND.NS', 'BRITANNIA.NS', 'DABUR.NS', 'MARICO.NS'],
-                    'bse': ['HINDUNILVR.BO', 'ITC.BO', 'NESTLEIND.BO', 'BRITANNIA.BO']
-                },
-                'Metals & Mining': {
-                    'nse': ['TATASTEEL.NS', 'JSWSTEEL.NS', 'HINDALCO.NS', 'COALINDIA.NS', 'VEDL.NS', 'SAIL.NS'],
-                    'bse': ['TATASTEEL.BO', 'JSWSTEEL.BO', 'HINDALCO.BO', 'COALINDIA.BO']
-                },
-                'Cement': {
-                    'nse': ['ULTRACEMCO.NS', 'SHREECEM.NS', 'GRASIM.NS', 'AMBUJACEM.NS', 'ACC.NS'],
-                    'bse': ['ULTRACEMCO.BO', 'SHREECEM.BO', 'GRASIM.BO', 'AMBUJACEM.BO']
-                },
-                'Textiles': {
-                    'nse': ['WELSPUNIND.NS', 'ARVIND.NS', 'PAGEIND.NS', 'VIPIND.NS'],
-                    'bse': ['WELSPUNIND.BO', 'ARVIND.BO']
-                },
-                'Telecommunications': {
-                    'nse': ['BHARTIARTL.NS', 'IDEA.NS'],
-                    'bse': ['BHARTIARTL.BO', 'IDEA.BO']
-                }
-            }
+            # Without a universe the curated sector lists are used; with one,
+            # every stock of the universe is grouped by its Yahoo sector
+            try:
+                snapshot = get_snapshot(exchange, universe)
+            except ValueError as e:
+                send_json(self, {
+                    "error": str(e)
+                }, status=400)
+                return
+            members = sector_members(snapshot, exchange, universe)
             
-            sectors_data = {}
+            if sector:
+                matching = members[members.str.lower() == sector.strip().lower()]
+                if matching.empty:
+                    send_json(self, {
+                        "error": f"Sector not found: {sector}",
+                        "available_sectors": sorted(members.unique())
+                    }, status=404)
+                    return
+                members = matching
             
-            for sector_name, sector_stocks in sectors.items():
-                stocks_list = sector_stocks.get(exchange, sector_stocks.get('nse', []))
-                sector_info = {
+            quotes = snapshot[snapshot.index.isin(members.index)]
+            
+            # Nothing to rebuild if the client already has these quotes
+            etag = make_etag(self, quote_fingerprint(quotes))
+            if send_not_modified(self, etag):
+                return
+            
+            # Every sector's aggregates in one groupby over the snapshot
+            table = sector_table(snapshot, members)
+            ranked = ranked_constituents(snapshot, members)
+            constituents = {name: rows for name, rows in ranked.groupby('sector', sort=False)}
+            
+            sectors_data = {}
+            for sector_name, row in zip(table.index, table.to_dict('records')):
+                # Constituents sorted by change percentage, best first
+                stocks = snapshot_records(
+                    constituents.get(sector_name, ranked.iloc[:0]),
+                    ['current_price', 'change', 'change_percent', 'volume'], exchange)
+                
+                sectors_data[sector_name] = {
                     "sector_name": sector_name,
-                    "total_stocks": len(stocks_list),
-                    "stocks": [],
+                    "total_stocks": int(row['total_stocks']),
+                    "stocks": stocks,
+                    "top_constituents": stocks[:top],
+                    "bottom_constituents": stocks[::-1][:top],
                     "sector_performance": {
-                        "total_gainers": 0,
-                        "total_losers": 0,
-                        "average_change": 0
+                        "total_gainers": int(row['total_gainers']),
+                        "total_losers": int(row['total_losers']),
+                        "unchanged": int(row['unchanged']),
+                        "average_change": round(float(row['average_change']), 2),
+                        "market_cap_weighted_change": rounded(row['market_cap_weighted_change']),
+                        "breadth": rounded(row['breadth']),
+                        "turnover": int(row['turnover']),
+                        "market_cap": int(row['market_cap'])
                     }
                 }
-                
-                total_change = 0
-                valid_stocks = 0
-                
-                for symbol in stocks_list:
-                    try:
-                        stock = yf.Ticker(symbol)
-                        history = stock.history(period="2d")
-                        info = stock.info
-                        
-                        if len(history) >= 2:
-                            latest = history.iloc[-1]
-                            previous = history.iloc[-2]
-                            
-                            change = float(latest['Close'] - previous['Close'])
-                            change_percent = ((float(latest['Close']) - float(previous['Close'])) / float(previous['Close'])) * 100
-                            
-                            stock_data = {
-                                "symbol": symbol,
-                                "name": info.get('longName', info.get('shortName', symbol.replace('.NS', '').replace('.BO', ''))),
-                                "current_price": round(float(latest['Close']), 2),
-                                "change": round(change, 2),
-                                "change_percent": round(change_percent, 2),
-                                "volume": int(latest['Volume']),
-                                "market_cap": info.get('marketCap', 0)
-                            }
-                            
-                            sector_info["stocks"].append(stock_data)
-                            
-                            # Update sector performance
-                            if change > 0:
-                                sector_info["sector_performance"]["total_gainers"] += 1
-                            elif change < 0:
-                                sector_info["sector_performance"]["total_losers"] += 1
-                            
-                            total_change += change_percent
-                            valid_stocks += 1
-                            
-                    except Exception as e:
-                        print(f"Error fetching data for {symbol}: {e}")
-                        continue
-                
-                # Calculate average change for sector
-                if valid_stocks > 0:
-                    sector_info["sector_performance"]["average_change"] = round(total_change / valid_stocks, 2)
-                
-                # Sort stocks by change percentage
-                sector_info["stocks"].sort(key=lambda x: x['change_percent'], reverse=True)
-                
-                sectors_data[sector_name] = sector_info
             
-            # Sort sectors by average performance
-            sorted_sectors = dict(sorted(sectors_data.items(), 
-                                       key=lambda x: x[1]["sector_performance"]["average_change"], 
-                                       reverse=True))
-            
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            send_json(self, {
                 "exchange": exchange.upper(),
-                "total_sectors": len(sorted_sectors),
-                "sectors": sorted_sectors
-            }, indent=2).encode())
+                "universe": universe,
+                "total_sectors": len(sectors_data),
+                "sectors": sectors_data,
+                # Sector constituents Yahoo returned no quote for, and why
+                "skipped": skipped_records(snapshot, members.index)
+            }, etag=etag)
             
+        except UpstreamError as e:
+            send_json(self, {
+                "error": str(e)
+            }, status=503)
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            send_json(self, {
                 "error": str(e)
-            }).encode())
\ No newline at end of file
+            }, status=500)
\ No newline at end of file
@@ -1,9 +1,12 @@
 from http.server import BaseHTTPRequestHandler
-import json
-import yfinance as yf
+import os
+import sys
 from urllib.parse import parse_qs, urlparse
-import pandas as pd
-from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from _lib.bar_store import load_history
+from _lib.bars import bar_records, bar_summary, iter_bar_records
+from _lib.responses import make_etag, send_json, send_ndjson, send_not_modified
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
@@ -17,80 +20,68 @@ class handler(BaseHTTPRequestHandler):
             end_date = query_params.get('end', [''])[0]
             period = query_params.get('period', ['1mo'])[0]
             interval = query_params.get('interval', ['1d'])[0]
+            stream = (query_params.get('format', ['json'])[0].lower() == 'ndjson'
+                      or query_params.get('stream', ['0'])[0] == '1')
             
             if not symbol:
-                self.send_response(400)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({
+                send_json(self, {
                     "error": "Symbol parameter is required"
-                }).encode())
+                }, status=400)
                 return
             
             # Fetch stock data
-            stock = yf.Ticker(symbol)
-            
-            # Determine how to fetch data
+            # Determine how to fetch data (long ranges are served from the local bar store,
+            # coarser intraday intervals are resampled from 1m/2m bars)
             if start_date and end_date:
-                history = stock.history(start=start_date, end=end_date, interval=interval)
+                history = load_history(symbol, interval=interval, start=start_date, end=end_date)
             else:
-                history = stock.history(period=period, interval=interval)
+                history = load_history(symbol, period=period, interval=interval)
             
             if history.empty:
-                self.send_response(404)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({
+                send_json(self, {
                     "error": f"No historical data found for symbol: {symbol}"
-                }).encode())
+                }, status=404)
+                return
+            
+            period_label = period if not (start_date and end_date) else f"{start_date} to {end_date}"
+            
+            # Past bars do not change, so the range plus the last bar identify the data
+            etag = make_etag(self, history.index[0], history.index[-1], len(history),
+                             history.iloc[-1].to_numpy().tobytes())
+            if send_not_modified(self, etag):
                 return
             
-            # Convert to list of dictionaries
-            historical_data = []
-            for date, row in history.iterrows():
-                historical_data.append({
-                    "date": date.strftime('%Y-%m-%d'),
-                    "open": round(float(row['Open']), 2),
-                    "high": round(float(row['High']), 2),
-                    "low": round(float(row['Low']), 2),
-                    "close": round(float(row['Close']), 2),
-                    "volume": int(row['Volume']),
-                    "change": round(float(row['Close'] - row['Open']), 2),
-                    "change_percent": round(((float(row['Close']) - float(row['Open'])) / float(row['Open'])) * 100, 2)
-                })
+            # NDJSON: one line per bar as it is produced, summary as the last line
+            if stream:
+                send_ndjson(self, self.ndjson_records(history, symbol, period_label, interval), etag=etag)
+                return
             
-            # Calculate summary statistics
-            closes = [item['close'] for item in historical_data]
+            # Convert to list of dictionaries (column-wise, no per-row pandas access)
+            historical_data = bar_records(history)
             
             response_data = {
                 "symbol": symbol,
-                "period": period if not (start_date and end_date) else f"{start_date} to {end_date}",
+                "period": period_label,
                 "interval": interval,
                 "total_records": len(historical_data),
-                "summary": {
-                    "highest_price": max(closes),
-                    "lowest_price": min(closes),
-                    "average_price": round(sum(closes) / len(closes), 2),
-                    "total_volume": sum([item['volume'] for item in historical_data]),
-                    "price_change": round(closes[-1] - closes[0], 2),
-                    "price_change_percent": round(((closes[-1] - closes[0]) / closes[0]) * 100, 2)
-                },
+                "summary": bar_summary(history),
                 "data": historical_data
             }
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(response_data, indent=2).encode())
+            send_json(self, response_data, etag=etag)
             
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            send_json(self, {
                 "error": str(e)
-            }).encode())
\ No newline at end of file
+            }, status=500)
+    
+    def ndjson_records(self, history, symbol, period_label, interval):
+        """Bars followed by a trailing summary record"""
+        yield from iter_bar_records(history)
+        yield {
+            "symbol": symbol,
+            "period": period_label,
+            "interval": interval,
+            "total_records": len(history),
+            "summary": bar_summary(history)
+        }
\ No newline at end of file
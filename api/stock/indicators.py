@@ -0,0 +1,92 @@
+from http.server import BaseHTTPRequestHandler
+import os
+import sys
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from _lib.bars import format_dates
+from _lib.indicators import get_indicators, parse_indicators
+from _lib.responses import make_etag, send_json, send_not_modified
+
+# Intervals whose bars are whole sessions
+DAILY_INTERVALS = ('1d', '5d', '1wk', '1mo', '3mo')
+
+def column_values(values):
+    """Rounded values with NaN (not enough history yet) as None"""
+    rounded = np.round(values, 2)
+    return [None if value != value else value for value in rounded.tolist()]
+
+class handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        try:
+            # Parse query parameters
+            parsed_url = urlparse(self.path)
+            query_params = parse_qs(parsed_url.query)
+            
+            symbol = query_params.get('symbol', [''])[0]
+            start_date = query_params.get('start', [''])[0]
+            end_date = query_params.get('end', [''])[0]
+            period = query_params.get('period', ['1y'])[0]
+            interval = query_params.get('interval', ['1d'])[0]
+            
+            if not symbol:
+                send_json(self, {
+                    "error": "Symbol parameter is required"
+                }, status=400)
+                return
+            
+            try:
+                specs = parse_indicators(query_params.get('indicators', [''])[0])
+            except ValueError as e:
+                send_json(self, {
+                    "error": str(e)
+                }, status=400)
+                return
+            
+            # Same bars as /api/stock/historical; indicators are memoized and
+            # only extended over bars that arrived since the last request
+            if start_date and end_date:
+                history, columns = get_indicators(symbol, specs, interval=interval, start=start_date, end=end_date)
+            else:
+                history, columns = get_indicators(symbol, specs, period=period, interval=interval)
+            
+            if history.empty:
+                send_json(self, {
+                    "error": f"No historical data found for symbol: {symbol}"
+                }, status=404)
+                return
+            
+            period_label = period if not (start_date and end_date) else f"{start_date} to {end_date}"
+            
+            etag = make_etag(self, history.index[0], history.index[-1], len(history),
+                             history.iloc[-1].to_numpy().tobytes())
+            if send_not_modified(self, etag):
+                return
+            
+            date_format = '%Y-%m-%d' if interval in DAILY_INTERVALS else '%Y-%m-%d %H:%M'
+            values = {
+                'date': format_dates(history.index, date_format).tolist(),
+                'close': column_values(history['Close'].to_numpy(dtype='float64')),
+            }
+            for name, column in columns.items():
+                values[name] = column_values(column)
+            
+            fields = list(values)
+            data = [dict(zip(fields, row)) for row in zip(*values.values())]
+            
+            send_json(self, {
+                "symbol": symbol,
+                "period": period_label,
+                "interval": interval,
+                "indicators": list(columns),
+                "total_records": len(data),
+                "latest": data[-1],
+                "data": data
+            }, etag=etag)
+            
+        except Exception as e:
+            send_json(self, {
+                "error": str(e)
+            }, status=500)
\ No newline at end of file
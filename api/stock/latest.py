@@ -1,8 +1,19 @@
 from http.server import BaseHTTPRequestHandler
-import json
-import yfinance as yf
+import os
+import sys
 from urllib.parse import parse_qs, urlparse
-import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from _lib.market_data import get_company_info, get_quote
+from _lib.quotes import download_history, frame_fingerprint, latest_bars
+from _lib.responses import make_etag, send_json, send_not_modified
+from _lib.rolling_stats import rolling_stats
+
+# Most symbols accepted by one symbols= batch request
+MAX_BATCH_SYMBOLS = 500
+
+# Response sections selectable with fields=
+FIELDS = ('latest_data', 'company_info', 'rolling_stats')
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
@@ -12,41 +23,56 @@ class handler(BaseHTTPRequestHandler):
             query_params = parse_qs(parsed_url.query)
             
             symbol = query_params.get('symbol', [''])[0]
+            symbols = query_params.get('symbols', [''])[0]
+            
+            # Watchlists: many symbols in one request
+            if symbols:
+                self.send_batch(symbols)
+                return
             
             if not symbol:
-                self.send_response(400)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({
+                send_json(self, {
                     "error": "Symbol parameter is required"
-                }).encode())
+                }, status=400)
+                return
+            
+            fields = query_params.get('fields', ['latest_data'])[0].lower()
+            fields = FIELDS if fields == 'all' else [f.strip() for f in fields.split(',') if f.strip()]
+            unknown = [f for f in fields if f not in FIELDS]
+            if unknown:
+                send_json(self, {
+                    "error": f"Unknown fields: {', '.join(unknown)}. Use any of {', '.join(FIELDS)} or all"
+                }, status=400)
                 return
             
-            # Fetch stock data
-            stock = yf.Ticker(symbol)
-            info = stock.info
-            history = stock.history(period="1d")
+            # Price and volume come from one chart request; the slow, rate
+            # limited Ticker.info call is only made for company_info
+            history, quote = get_quote(symbol)
             
             if history.empty:
-                self.send_response(404)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({
+                send_json(self, {
                     "error": f"No data found for symbol: {symbol}"
-                }).encode())
+                }, status=404)
                 return
             
+            info = get_company_info(symbol) if 'company_info' in fields else None
+            
             # Get latest data
             latest = history.iloc[-1]
             
+            # 52-week range and moving averages from the stored daily bars
+            stats = rolling_stats(symbol, latest) if 'rolling_stats' in fields else None
+            
+            etag = make_etag(self, latest.name, latest.to_numpy().tobytes(), quote, info, stats)
+            if send_not_modified(self, etag):
+                return
+            
             # Prepare response
             response_data = {
                 "symbol": symbol,
-                "company_name": info.get('longName', info.get('shortName', symbol)),
-                "exchange": info.get('exchange', ''),
-                "currency": info.get('currency', 'INR'),
+                "company_name": quote['name'],
+                "exchange": quote['exchange'],
+                "currency": quote['currency'],
                 "latest_data": {
                     "date": latest.name.strftime('%Y-%m-%d'),
                     "open": round(float(latest['Open']), 2),
@@ -56,8 +82,12 @@ class handler(BaseHTTPRequestHandler):
                     "volume": int(latest['Volume']),
                     "change": round(float(latest['Close'] - latest['Open']), 2),
                     "change_percent": round(((float(latest['Close']) - float(latest['Open'])) / float(latest['Open'])) * 100, 2)
-                },
-                "company_info": {
+                }
+            }
+            
+            if info is not None:
+                response_data["company_name"] = info.get('longName', info.get('shortName', quote['name']))
+                response_data["company_info"] = {
                     "sector": info.get('sector', ''),
                     "industry": info.get('industry', ''),
                     "market_cap": info.get('marketCap', ''),
@@ -68,19 +98,47 @@ class handler(BaseHTTPRequestHandler):
                     "website": info.get('website', ''),
                     "business_summary": info.get('businessSummary', '')[:200] + '...' if info.get('businessSummary') and len(info.get('businessSummary', '')) > 200 else info.get('businessSummary', '')
                 }
-            }
+            if stats is not None:
+                response_data["rolling_stats"] = {
+                    key: round(value, 2) if isinstance(value, float) else value
+                    for key, value in stats.items() if key != 'period_change_percent'
+                }
+            if 'latest_data' not in fields:
+                del response_data["latest_data"]
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(response_data, indent=2).encode())
+            send_json(self, response_data, etag=etag)
             
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            send_json(self, {
                 "error": str(e)
-            }).encode())
\ No newline at end of file
+            }, status=500)
+    
+    def send_batch(self, symbols_param):
+        """Latest data for a comma-separated symbol list from one batched download"""
+        symbols = list(dict.fromkeys(s.strip() for s in symbols_param.split(',') if s.strip()))
+        
+        if len(symbols) > MAX_BATCH_SYMBOLS:
+            send_json(self, {
+                "error": f"At most {MAX_BATCH_SYMBOLS} symbols can be requested at once"
+            }, status=400)
+            return
+        
+        bars = latest_bars(download_history(symbols, period="1d"))
+        
+        etag = make_etag(self, frame_fingerprint(bars))
+        if send_not_modified(self, etag):
+            return
+        
+        records = dict(zip(bars.index, bars.to_dict('records')))
+        quotes = {}
+        for symbol in symbols:
+            if symbol in records:
+                quotes[symbol] = {"symbol": symbol, "latest_data": records[symbol]}
+            else:
+                quotes[symbol] = {"symbol": symbol, "error": f"No data found for symbol: {symbol}"}
+        
+        send_json(self, {
+            "total_symbols": len(symbols),
+            "total_errors": len(symbols) - len(records),
+            "quotes": quotes
+        }, etag=etag)
\ No newline at end of file
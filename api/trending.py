@@ -1,8 +1,14 @@
 from http.server import BaseHTTPRequestHandler
-import json
-import yfinance as yf
+import os
+import sys
 from urllib.parse import parse_qs, urlparse
-import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _lib.quotes import quote_fingerprint, top_k
+from _lib.responses import make_etag, send_json, send_not_modified
+from _lib.snapshot import get_snapshot, skipped_records, snapshot_records, with_metadata
+from _lib.upstream import UpstreamError
+from _lib.universes import DEFAULT_UNIVERSE
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
@@ -14,69 +20,45 @@ class handler(BaseHTTPRequestHandler):
             exchange = query_params.get('exchange', ['nse'])[0].lower()
             limit = int(query_params.get('limit', [20])[0])
             
-            # Popular Indian stocks by market cap and trading volume
-            trending_stocks = {
-                'nse': [
-                    'RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'INFY.NS', 'HINDUNILVR.NS',
-                    'ICICIBANK.NS', 'BHARTIARTL.NS', 'SBIN.NS', 'ITC.NS', 'LT.NS',
-                    'KOTAKBANK.NS', 'AXISBANK.NS', 'ASIANPAINT.NS', 'MARUTI.NS', 'SUNPHARMA.NS',
-                    'TITAN.NS', 'ULTRACEMCO.NS', 'ONGC.NS', 'NESTLEIND.NS', 'WIPRO.NS',
-                    'POWERGRID.NS', 'NTPC.NS', 'BAJFINANCE.NS', 'HCLTECH.NS', 'TECHM.NS'
-                ],
-                'bse': [
-                    'RELIANCE.BO', 'TCS.BO', 'HDFCBANK.BO', 'INFY.BO', 'HINDUNILVR.BO',
-                    'ICICIBANK.BO', 'BHARTIARTL.BO', 'SBIN.BO', 'ITC.BO', 'LT.BO',
-                    'KOTAKBANK.BO', 'AXISBANK.BO', 'ASIANPAINT.BO', 'MARUTI.BO', 'SUNPHARMA.BO',
-                    'TITAN.BO', 'ULTRACEMCO.BO', 'ONGC.BO', 'NESTLEIND.BO', 'WIPRO.BO'
-                ]
-            }
+            universe = query_params.get('universe', [DEFAULT_UNIVERSE])[0].lower()
+            
+            # A view over the shared market snapshot
+            try:
+                quotes = get_snapshot(exchange, universe)
+            except ValueError as e:
+                send_json(self, {
+                    "error": str(e)
+                }, status=400)
+                return
             
-            stocks_to_check = trending_stocks.get(exchange, trending_stocks['nse'])[:limit]
-            trending_data = []
+            # Nothing to rebuild if the client already has these quotes
+            etag = make_etag(self, quote_fingerprint(quotes))
+            if send_not_modified(self, etag):
+                return
             
-            for symbol in stocks_to_check:
-                try:
-                    stock = yf.Ticker(symbol)
-                    history = stock.history(period="5d")
-                    info = stock.info
-                    
-                    if not history.empty:
-                        latest = history.iloc[-1]
-                        prev = history.iloc[-2] if len(history) > 1 else history.iloc[-1]
-                        
-                        trending_data.append({
-                            "symbol": symbol,
-                            "name": info.get('longName', info.get('shortName', symbol.replace('.NS', '').replace('.BO', ''))),
-                            "current_price": round(float(latest['Close']), 2),
-                            "change": round(float(latest['Close'] - prev['Close']), 2),
-                            "change_percent": round(((float(latest['Close']) - float(prev['Close'])) / float(prev['Close'])) * 100, 2),
-                            "volume": int(latest['Volume']),
-                            "market_cap": info.get('marketCap', 0),
-                            "sector": info.get('sector', ''),
-                            "exchange": exchange.upper()
-                        })
-                except Exception as e:
-                    print(f"Error fetching data for {symbol}: {e}")
-                    continue
+            # Universe symbols Yahoo returned no quote for, and why
+            skipped = skipped_records(quotes)
             
-            # Sort by volume (trending indicator)
-            trending_data.sort(key=lambda x: x['volume'], reverse=True)
+            # Most traded by volume (trending indicator)
+            quotes = with_metadata(quotes.iloc[top_k(quotes['volume'].to_numpy(dtype='float64'), limit)])
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            trending_data = snapshot_records(quotes, [
+                'current_price', 'change', 'change_percent', 'volume'
+            ], exchange)
+            
+            send_json(self, {
                 "exchange": exchange.upper(),
+                "universe": universe,
                 "total_stocks": len(trending_data),
-                "trending_stocks": trending_data
-            }, indent=2).encode())
+                "trending_stocks": trending_data,
+                "skipped": skipped
+            }, etag=etag)
             
+        except UpstreamError as e:
+            send_json(self, {
+                "error": str(e)
+            }, status=503)
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            send_json(self, {
                 "error": str(e)
-            }).encode())
\ No newline at end of file
+            }, status=500)
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""Rows/sec of /api/stock/historical serialization, before and after vectorizing.
+
+Usage: python benchmarks/historical_serialization.py [rows]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+from _lib.bars import bar_records, bar_summary
+
+
+def make_history(rows):
+    """Synthetic 1-minute bars shaped like Ticker.history() output"""
+    rng = np.random.default_rng(42)
+    index = pd.date_range('2020-01-01 09:15', periods=rows, freq='min', tz='Asia/Kolkata')
+    close = 1000 + rng.normal(0, 1, rows).cumsum()
+    return pd.DataFrame({
+        'Open': close + rng.normal(0, 0.5, rows),
+        'High': close + 2,
+        'Low': close - 2,
+        'Close': close,
+        'Volume': rng.integers(1_000, 100_000, rows)
+    }, index=index)
+
+
+def legacy(history):
+    """The original iterrows() implementation"""
+    historical_data = []
+    for date, row in history.iterrows():
+        historical_data.append({
+            "date": date.strftime('%Y-%m-%d'),
+            "open": round(float(row['Open']), 2),
+            "high": round(float(row['High']), 2),
+            "low": round(float(row['Low']), 2),
+            "close": round(float(row['Close']), 2),
+            "volume": int(row['Volume']),
+            "change": round(float(row['Close'] - row['Open']), 2),
+            "change_percent": round(((float(row['Close']) - float(row['Open'])) / float(row['Open'])) * 100, 2)
+        })
+
+    closes = [item['close'] for item in historical_data]
+    summary = {
+        "highest_price": max(closes),
+        "lowest_price": min(closes),
+        "average_price": round(sum(closes) / len(closes), 2),
+        "total_volume": sum([item['volume'] for item in historical_data]),
+        "price_change": round(closes[-1] - closes[0], 2),
+        "price_change_percent": round(((closes[-1] - closes[0]) / closes[0]) * 100, 2)
+    }
+    return historical_data, summary
+
+
+def vectorized(history):
+    return bar_records(history), bar_summary(history)
+
+
+def bench(fn, history, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(history)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    history = make_history(rows)
+
+    legacy_time, (legacy_rows, legacy_summary) = bench(legacy, history, repeat=1)
+    new_time, (new_rows, new_summary) = bench(vectorized, history)
+
+    mismatches = sum(a != b for a, b in zip(legacy_rows, new_rows))
+    print(f"rows:        {rows}")
+    print(f"iterrows:    {legacy_time:8.3f}s  {rows / legacy_time:12,.0f} rows/sec")
+    print(f"vectorized:  {new_time:8.3f}s  {rows / new_time:12,.0f} rows/sec")
+    print(f"speedup:     {legacy_time / new_time:8.1f}x")
+    print(f"mismatched rows: {mismatches}, summary equal: {legacy_summary == new_summary}")
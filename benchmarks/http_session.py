@@ -0,0 +1,84 @@
+"""Per-request latency of Yahoo calls with and without the pooled keep-alive session.
+
+Without a session yfinance opens a new TCP connection and negotiates TLS
+for every request; the pooled session does that once and reuses the
+connection. The difference is what each request on a warm instance saves.
+
+Usage: python benchmarks/http_session.py [--url URL] [--requests 20] [--insecure]
+"""
+import argparse
+import os
+import socket
+import ssl
+import statistics
+import sys
+import time
+from urllib.parse import urlparse
+
+import requests
+import urllib3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+from _lib.http_session import make_session
+
+DEFAULT_URL = 'https://query1.finance.yahoo.com/v8/finance/chart/TCS.NS?range=1d&interval=1d'
+
+# The headers yfinance sends with every request
+HEADERS = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_10_1) AppleWebKit/537.36 '
+                         '(KHTML, like Gecko) Chrome/39.0.2171.95 Safari/537.36'}
+
+
+def handshake(url, verify):
+    """Seconds for the TCP connect and the TLS handshake to url's host"""
+    parsed = urlparse(url)
+    context = ssl.create_default_context()
+    if not verify:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    started = time.perf_counter()
+    with socket.create_connection((parsed.hostname, parsed.port or 443), timeout=10) as sock:
+        connected = time.perf_counter()
+        with context.wrap_socket(sock, server_hostname=parsed.hostname):
+            done = time.perf_counter()
+    return connected - started, done - connected
+
+
+def timed(get, url, count, verify):
+    times = []
+    for _ in range(count):
+        started = time.perf_counter()
+        get(url, headers=HEADERS, timeout=30, verify=verify).content
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default=DEFAULT_URL)
+    parser.add_argument('--requests', type=int, default=20, help="Requests per mode (default: %(default)s)")
+    parser.add_argument('--insecure', action='store_true', help="Skip certificate checks (self-signed test servers)")
+    args = parser.parse_args()
+    verify = not args.insecure
+    if not verify:
+        urllib3.disable_warnings()
+
+    connects, tls = zip(*[handshake(args.url, verify) for _ in range(5)])
+
+    # What yfinance does without a session: module-level requests.get
+    fresh = timed(requests.get, args.url, args.requests, verify)
+
+    session = make_session()
+    session.get(args.url, headers=HEADERS, timeout=30, verify=verify).content
+    pooled = timed(session.get, args.url, args.requests, verify)
+
+    fresh_ms, pooled_ms = statistics.median(fresh) * 1000, statistics.median(pooled) * 1000
+    print(f"url:               {args.url}")
+    print(f"tcp connect:       {statistics.median(connects) * 1000:8.2f} ms (median of 5)")
+    print(f"tls handshake:     {statistics.median(tls) * 1000:8.2f} ms (median of 5)")
+    print(f"new connection:    {fresh_ms:8.2f} ms/request (median of {args.requests})")
+    print(f"pooled keep-alive: {pooled_ms:8.2f} ms/request (median of {args.requests})")
+    print(f"saved per request: {fresh_ms - pooled_ms:8.2f} ms ({(1 - pooled_ms / fresh_ms) * 100:.0f}%)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Cold-start import time of every endpoint, checked against pinned budgets.
+
+Each handler is loaded in a fresh interpreter under -X importtime, the
+way a cold Vercel instance loads it. The report lists the total import
+time and the slowest top-level imports. The run fails (exit status 1)
+when a handler exceeds its budget, or imports a module it must not: the
+pure endpoints never load pandas, numpy, yfinance or requests, and no
+endpoint loads yfinance or requests before its first upstream call.
+
+Usage: python benchmarks/import_time.py [--repeat 5] [--scale 1.5] [--top 5]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api')
+
+PURE = ('pandas', 'numpy', 'yfinance', 'requests')
+LAZY = ('yfinance', 'requests')
+
+# Handler -> (import time budget in ms, modules it must not import)
+BUDGETS = {
+    'index.py': (60, PURE),
+    'search.py': (60, PURE),
+    'market-status.py': (60, PURE),
+    'gainers.py': (400, LAZY),
+    'losers.py': (400, LAZY),
+    'trending.py': (400, LAZY),
+    'sectors.py': (400, LAZY),
+    'indices.py': (400, LAZY),
+    'fundamentals.py': (400, LAZY),
+    'stock/latest.py': (400, LAZY),
+    'stock/historical.py': (400, LAZY),
+    'stock/indicators.py': (400, LAZY),
+}
+
+LOADER = (
+    "import importlib.util, sys\n"
+    "spec = importlib.util.spec_from_file_location('handler', {path!r})\n"
+    "spec.loader.exec_module(importlib.util.module_from_spec(spec))\n"
+)
+
+
+def import_log(code):
+    """[(module, cumulative microseconds, depth)] logged by -X importtime while running code"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            capture_output=True, text=True, cwd=API_DIR)
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        entries.append((name.strip(), int(cumulative), (len(name) - len(name.lstrip())) // 2))
+    return entries
+
+
+def measure(handler, startup):
+    """(total ms, {top-level module: ms}, every module imported) of loading handler"""
+    path = os.path.abspath(os.path.join(API_DIR, handler))
+    entries = [entry for entry in import_log(LOADER.format(path=path)) if entry[0] not in startup]
+    top = {name: cumulative / 1000 for name, cumulative, depth in entries if depth == 0}
+    return sum(top.values()), top, {name for name, _, _ in entries}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per handler; the fastest counts (default: %(default)s)")
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiply every budget, for slower machines")
+    parser.add_argument('--top', type=int, default=3, help="Slowest top-level imports to list (default: %(default)s)")
+    args = parser.parse_args()
+
+    # Modules the interpreter imports before running any handler code
+    startup = {name for name, _, _ in import_log("import importlib.util")}
+
+    failures = []
+    for handler, (budget, forbidden) in BUDGETS.items():
+        total, top, modules = min((measure(handler, startup) for _ in range(args.repeat)), key=lambda run: run[0])
+        budget *= args.scale
+        loaded = sorted(set(forbidden) & modules)
+        slowest = ', '.join(f"{name} {ms:.0f}" for name, ms in sorted(top.items(), key=lambda item: -item[1])[:args.top])
+        ok = total <= budget and not loaded
+        print(f"{'ok  ' if ok else 'FAIL'} {handler:22} {total:7.1f} ms / {budget:4.0f} ms   {slowest}")
+        if total > budget:
+            failures.append(f"{handler}: {total:.1f} ms exceeds its {budget:.0f} ms budget")
+        if loaded:
+            failures.append(f"{handler}: imports {', '.join(loaded)}")
+
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""Rebuild api/_data/symbols.csv and universes.csv from the exchanges' own listing files.
+
+NSE publishes every listed equity (symbol, company name, series, ISIN) as
+EQUITY_L.csv, which is downloaded unless a local copy is given. BSE's
+list of scrips has to be exported from bseindia.com (Corporates > List
+of Securities, segment Equity) and passed with --bse. The NIFTY
+constituent lists are downloaded from NSE unless
+--skip-universes is given.
+
+Usage: python scripts/build_symbol_master.py [--nse EQUITY_L.csv] [--bse Equity.csv] [--skip-universes]
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+
+import requests
+
+NSE_EQUITY_LIST = 'https://nsearchives.nseindia.com/content/equities/EQUITY_L.csv'
+
+# Constituent lists per universe, with the NSE symbol in the Symbol column
+NIFTY_LISTS = {
+    'nifty50': 'https://nsearchives.nseindia.com/content/indices/ind_nifty50list.csv',
+    'nifty100': 'https://nsearchives.nseindia.com/content/indices/ind_nifty100list.csv',
+    'nifty200': 'https://nsearchives.nseindia.com/content/indices/ind_nifty200list.csv',
+    'nifty500': 'https://nsearchives.nseindia.com/content/indices/ind_nifty500list.csv',
+}
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api', '_data')
+
+OUTPUT = os.path.join(DATA_DIR, 'symbols.csv')
+
+UNIVERSES_OUTPUT = os.path.join(DATA_DIR, 'universes.csv')
+
+FIELDS = ['symbol', 'name', 'isin', 'series', 'exchange']
+
+
+def read_csv(source):
+    """Rows of a local CSV file or URL, with surrounding whitespace stripped from headers and values"""
+    if source.startswith('http'):
+        response = requests.get(source, headers={'User-Agent': 'Mozilla/5.0'}, timeout=30)
+        response.raise_for_status()
+        text = response.text
+    else:
+        with open(source, encoding='utf-8-sig') as f:
+            text = f.read()
+    for row in csv.DictReader(io.StringIO(text)):
+        yield {key.strip(): (value or '').strip() for key, value in row.items() if key}
+
+
+def nse_listings(source):
+    for row in read_csv(source):
+        yield {
+            'symbol': row['SYMBOL'] + '.NS',
+            'name': row['NAME OF COMPANY'],
+            'isin': row.get('ISIN NUMBER', ''),
+            'series': row.get('SERIES', ''),
+            'exchange': 'NSE',
+        }
+
+
+def bse_listings(source):
+    for row in read_csv(source):
+        if row.get('Status', 'Active') != 'Active' or row.get('Instrument', 'Equity') != 'Equity':
+            continue
+        yield {
+            'symbol': row['Security Id'] + '.BO',
+            'name': row.get('Issuer Name') or row['Security Name'],
+            'isin': row.get('ISIN No', ''),
+            'series': row.get('Group', ''),
+            'exchange': 'BSE',
+        }
+
+
+def universe_rows():
+    for universe, source in NIFTY_LISTS.items():
+        for symbol in sorted({row['Symbol'] for row in read_csv(source)}):
+            yield universe, symbol
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nse', default=NSE_EQUITY_LIST, help="EQUITY_L.csv path or URL (default: %(default)s)")
+    parser.add_argument('--bse', help="BSE list of scrips CSV export")
+    parser.add_argument('--output', default=OUTPUT, help="Where to write the master (default: api/_data/symbols.csv)")
+    parser.add_argument('--skip-universes', action='store_true', help="Leave api/_data/universes.csv as it is")
+    args = parser.parse_args()
+
+    listings = list(nse_listings(args.nse))
+    if args.bse:
+        listings += bse_listings(args.bse)
+    listings.sort(key=lambda listing: (listing['exchange'] != 'NSE', listing['symbol']))
+
+    with open(args.output, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(listings)
+
+    counts = {}
+    for listing in listings:
+        counts[listing['exchange']] = counts.get(listing['exchange'], 0) + 1
+    print(f"{len(listings)} listings ({', '.join(f'{n} {e}' for e, n in counts.items())}) -> {args.output}")
+
+    if not args.skip_universes:
+        rows = list(universe_rows())
+        with open(UNIVERSES_OUTPUT, 'w', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(['universe', 'symbol'])
+            writer.writerows(rows)
+        print(f"{len(rows)} universe constituents -> {UNIVERSES_OUTPUT}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
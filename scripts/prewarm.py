@@ -0,0 +1,38 @@
+"""Keep the hot datasets warm during market hours, as a worker or from cron.
+
+Refreshes the index quotes and the market snapshot behind gainers, losers,
+trending and sectors every --interval seconds between 09:15 and 15:30 IST.
+With --url the endpoints of a deployment are requested instead, filling
+its warm instances and edge cache.
+
+Usage: python scripts/prewarm.py [--once] [--force] [--url https://your-app.vercel.app] [--interval 60]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+from _lib.prewarm import PREWARM_EXCHANGES, PREWARM_INTERVAL, run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="Warm a deployment over HTTP, e.g. https://your-app.vercel.app")
+    parser.add_argument('--interval', type=int, default=PREWARM_INTERVAL,
+                        help="Seconds between passes (default: %(default)s)")
+    parser.add_argument('--exchanges', default=','.join(PREWARM_EXCHANGES),
+                        help="Comma-separated exchanges (default: %(default)s)")
+    parser.add_argument('--once', action='store_true', help="Run one pass and exit, e.g. from cron")
+    parser.add_argument('--force', action='store_true', help="Run even while the market is closed")
+    args = parser.parse_args()
+
+    try:
+        run(interval=args.interval, once=args.once, force=args.force, base_url=args.url,
+            exchanges=args.exchanges.split(','))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,43 @@
+"""Bulk refresh of the fundamentals store, meant to run as a background job.
+
+Only rows that are missing or due for a refresh are fetched, so running it
+daily (e.g. from cron) keeps /api/fundamentals a purely local read.
+
+Usage: python scripts/refresh_fundamentals.py [--force] [--file symbols.txt] [SYMBOL ...]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+from _lib.fundamentals_store import DB_PATH, SOURCES, refresh_all
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('symbols', nargs='*', help="Yahoo symbols, e.g. RELIANCE.NS")
+    parser.add_argument('--file', help="File with one symbol per line")
+    parser.add_argument('--sources', default=','.join(SOURCES), help="Comma-separated subset of %(default)s")
+    parser.add_argument('--force', action='store_true', help="Refetch rows that are still fresh")
+    parser.add_argument('--workers', type=int, default=4, help="Parallel upstream calls (default: %(default)s)")
+    args = parser.parse_args()
+
+    symbols = list(args.symbols)
+    if args.file:
+        with open(args.file) as f:
+            symbols += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    if not symbols:
+        parser.error("no symbols given")
+
+    started = time.perf_counter()
+    refreshed, errors = refresh_all(symbols, sources=args.sources.split(','),
+                                    force=args.force, max_workers=args.workers)
+    for (symbol, source), error in sorted(errors.items()):
+        print(f"{symbol} {source}: {error}", file=sys.stderr)
+    print(f"{len(refreshed)} refreshed, {len(errors)} failed in {time.perf_counter() - started:.1f}s -> {DB_PATH}")
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
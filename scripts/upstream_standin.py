@@ -0,0 +1,98 @@
+"""Record Yahoo responses into fixtures, and replay them from a local stand-in server.
+
+record fetches the history, info and financial statements of the given
+symbols (and, with --snapshot, the index quotes, the market snapshot and
+the company info of its symbols)
+with every Yahoo response saved under --fixtures. serve answers those
+requests from the fixtures, with injected latency and errors; run the
+API with YFINAPI_UPSTREAM_URL pointing at it to load-test or benchmark
+any endpoint offline and repeatably.
+
+Usage: python scripts/upstream_standin.py record --fixtures DIR [--snapshot] SYMBOL [SYMBOL ...]
+       python scripts/upstream_standin.py serve --fixtures DIR [--port 8765] [--latency 80] [--jitter 40] [--error-rate 0.02]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+# (period, interval) of the recorded history: the daily bars behind the
+# historical endpoint, the 2y base window of the indicators and rolling
+# stats, and the intraday sources that the coarser intervals are
+# resampled from. Start/end requests (the bar store's tail and backfill
+# fetches) are served from the shortest of these covering their start.
+HISTORY = [('1d', '1d'), ('5d', '1m'), ('5d', '2m'), ('1mo', '1d'), ('1y', '1d'), ('2y', '1d'),
+           ('5y', '1wk')]
+
+
+def record(fixtures, symbols, snapshot=False):
+    """Fetch the recorded datasets for symbols; returns {task: error}"""
+    # The session reads YFINAPI_RECORD_DIR when it is created
+    os.environ['YFINAPI_RECORD_DIR'] = fixtures
+    os.makedirs(fixtures, exist_ok=True)
+    from _lib.fetcher import fetch_all
+    from _lib.fundamentals_store import SOURCES
+    from _lib.market_data import fetch_fundamentals, fetch_history, get_quote
+    from _lib.prewarm import warm_indices, warm_metadata, warm_snapshot
+
+    tasks = {}
+    for symbol in symbols:
+        tasks[f"{symbol} quote"] = lambda symbol=symbol: get_quote(symbol)
+        for period, interval in HISTORY:
+            tasks[f"{symbol} history {period}/{interval}"] = (
+                lambda symbol=symbol, period=period, interval=interval:
+                fetch_history(symbol, period=period, interval=interval))
+        for source in SOURCES:
+            tasks[f"{symbol} {source}"] = lambda symbol=symbol, source=source: fetch_fundamentals(symbol, source)
+
+    _, errors = fetch_all(lambda name: tasks[name](), list(tasks))
+    if snapshot:
+        errors.update(warm_indices())
+        errors.update(warm_snapshot('nse'))
+        errors.update(warm_metadata('nse', deadline=3600))
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    recorder = commands.add_parser('record', help="Save the Yahoo responses for some symbols as fixtures")
+    recorder.add_argument('--fixtures', required=True, help="Fixture directory")
+    recorder.add_argument('--snapshot', action='store_true', help="Also record the index quotes, the NSE snapshot and its company info")
+    recorder.add_argument('symbols', nargs='+', help="Yahoo symbols, e.g. RELIANCE.NS TCS.NS")
+
+    server = commands.add_parser('serve', help="Serve the fixtures as a stand-in for Yahoo")
+    server.add_argument('--fixtures', required=True, help="Fixture directory")
+    server.add_argument('--host', default='127.0.0.1')
+    server.add_argument('--port', type=int, default=8765)
+    server.add_argument('--latency', type=float, default=0, help="Milliseconds added to every response")
+    server.add_argument('--jitter', type=float, default=0, help="Up to this many more milliseconds, at random")
+    server.add_argument('--error-rate', type=float, default=0, help="Share of requests that fail, 0 to 1")
+    server.add_argument('--error-status', type=int, default=429, help="Status of the failed requests (default: %(default)s)")
+    server.add_argument('--seed', type=int, help="Seed for the latency and error draws")
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        errors = record(args.fixtures, args.symbols, args.snapshot)
+        for name, error in errors.items():
+            print(f"{name}: {error}", file=sys.stderr)
+        print(f"{len([name for name in os.listdir(args.fixtures) if name.endswith('.json')])} fixtures in {args.fixtures}")
+        return 1 if errors else 0
+
+    from _lib.replay import make_standin
+    standin = make_standin(args.fixtures, args.host, args.port, latency=args.latency / 1000,
+                           jitter=args.jitter / 1000, error_rate=args.error_rate,
+                           error_status=args.error_status, seed=args.seed)
+    print(f"Serving {len(standin.fixtures)} fixtures on http://{args.host}:{args.port}"
+          f" - run the API with YFINAPI_UPSTREAM_URL=http://{args.host}:{args.port}")
+    try:
+        standin.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())